@@ -0,0 +1,140 @@
+import os
+import threading
+import concurrent.futures
+from contextlib import ExitStack
+
+# Tryb wsadowy dla skryptów konwertujących pojedynczy projekt w miejscu.
+# Argumenty: pliki projektów, foldery z projektami albo pliki .txt / @lista z jedną ścieżką w linii.
+
+SINGLE_FILE_EXTENSIONS = (".gmez", ".gmz", ".yymp", ".yyz", ".yymps")
+FOLDER_PROJECT_EXTENSIONS = (".yyp", ".project.gmx")
+
+
+def read_list_file(list_path):
+    with open(list_path, "r", encoding="utf-8") as list_file:
+        return [line.strip().strip('"') for line in list_file if line.strip() and not line.startswith("#")]
+
+
+def find_projects_in_directory(directory):
+    """Projekty w folderze: pojedyncze pliki oraz .yyp/.project.gmx w nim samym i w podfolderach pierwszego poziomu"""
+    found = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and name.endswith(SINGLE_FILE_EXTENSIONS + FOLDER_PROJECT_EXTENSIONS):
+            found.append(path)
+        elif os.path.isdir(path):
+            for sub_name in sorted(os.listdir(path)):
+                if sub_name.endswith(FOLDER_PROJECT_EXTENSIONS):
+                    found.append(os.path.join(path, sub_name))
+    return found
+
+
+def collect_project_paths(arguments):
+    """Rozwija argumenty wiersza poleceń do listy plików projektów (bez duplikatów, w kolejności)"""
+    project_paths = []
+    for argument in arguments:
+        if argument.startswith("@"):
+            project_paths.extend(collect_project_paths(read_list_file(argument[1:])))
+        elif os.path.isdir(argument):
+            project_paths.extend(find_projects_in_directory(argument))
+        elif argument.lower().endswith(".txt") and os.path.isfile(argument):
+            project_paths.extend(collect_project_paths(read_list_file(argument)))
+        else:
+            project_paths.append(argument)
+
+    unique_paths = []
+    seen = set()
+    for path in project_paths:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique_paths.append(path)
+    return unique_paths
+
+
+def get_directory_key(directory):
+    return os.path.normcase(os.path.abspath(directory))
+
+
+class DirectoryLocks:
+    """
+    Jedna blokada na folder nadrzędny - konwersje w tym samym folderze współdzielą _old, _gmx, mvc i options,
+    więc wykonują się po kolei, a projekty z różnych folderów równolegle
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, directory):
+        key = get_directory_key(directory)
+        with self._guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+
+def get_directories_to_lock(project_path, batch_directories):
+    """
+    Folder projektu i każdy folder nadrzędny, w którym też jest projekt z tej partii - konwersja w miejscu
+    przenosi wszystkie podfoldery do _old, więc projekt zagnieżdżony (D/sub/Y.yyp) nie może się konwertować
+    razem z projektem w D. Kolejność posortowana, żeby blokady były zawsze brane w tym samym porządku.
+    """
+    directory = get_directory_key(os.path.dirname(os.path.abspath(project_path)))
+    return sorted(
+        batch_directory for batch_directory in batch_directories
+        if batch_directory == directory or directory.startswith(os.path.join(batch_directory, ""))
+    )
+
+
+def run_batch(project_paths, convert_function, max_workers, log=print):
+    """
+    Konwertuje projekty równolegle (co najwyżej max_workers naraz). Zwraca listę projektów, które się nie udały.
+    Projekt zagnieżdżony (D/sub/Y.yyp) jest konwertowany przed projektem z folderu nadrzędnego (D/X.yyp),
+    bo konwersja w miejscu przenosi potem cały D/sub do _old.
+    """
+    directory_locks = DirectoryLocks()
+    batch_directories = {get_directory_key(os.path.dirname(os.path.abspath(path))) for path in project_paths}
+
+    def convert_locked(project_path, prerequisites):
+        concurrent.futures.wait(prerequisites)
+        with ExitStack() as stack:
+            for directory in get_directories_to_lock(project_path, batch_directories):
+                stack.enter_context(directory_locks.get(directory))
+            return convert_function(project_path)
+
+    # Najgłębsze foldery najpierw: pula bierze zadania po kolei, więc gdy projekt z folderu nadrzędnego
+    # czeka na swoje podfoldery, one już działają albo się skończyły (bez zakleszczenia)
+    ordered_paths = sorted(
+        project_paths, key=lambda path: get_directory_key(os.path.dirname(os.path.abspath(path))).count(os.sep),
+        reverse=True
+    )
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        futures_by_directory = {}
+        for path in ordered_paths:
+            directory = get_directory_key(os.path.dirname(os.path.abspath(path)))
+            prerequisites = [
+                future
+                for other_directory, directory_futures in futures_by_directory.items()
+                if other_directory.startswith(os.path.join(directory, ""))
+                for future in directory_futures
+            ]
+            future = executor.submit(convert_locked, path, prerequisites)
+            futures_by_directory.setdefault(directory, []).append(future)
+            futures[future] = path
+        for future in concurrent.futures.as_completed(futures):
+            project_path = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                log(f"Conversion of {project_path} failed with exception: {e}")
+                success = False
+            if not success:
+                failed.append(project_path)
+
+    log(f"Batch finished: {len(project_paths) - len(failed)} converted, {len(failed)} failed")
+    for project_path in failed:
+        log(f"Failed: {project_path}")
+    return failed
@@ -1,10 +1,12 @@
 import os
-import subprocess
 import logging
 import shutil
 import sys
 from datetime import datetime
 
+from gm_batch import collect_project_paths, run_batch
+from gm_runner import as_runner, default_prefabs_folder, get_runner
+
 # Configure logging
 logging.basicConfig(
     filename='conversion_log.txt',
@@ -14,8 +16,9 @@ logging.basicConfig(
 )
 
 # Paths
-projecttool_path = r"C:\Program Files\GameMaker\ProjectTool\ProjectTool.exe"
-prefabs_folder = os.path.join(os.getenv("APPDATA"), "GameMakerStudio2", "Prefabs")
+# Backend ProjectTool: GM_RUNNER=windows|wine|container|fake (patrz gm_runner.py)
+projecttool_path = get_runner()
+prefabs_folder = default_prefabs_folder()
 
 def log_message(message):
     """Loguje wiadomość do pliku i konsoli"""
@@ -29,25 +32,11 @@ def process_project(project_path, new_project_path, projecttool_executable, pref
     try:
         log_message(f"Processing project: {project_path}")
 
-        save_command = [
-            projecttool_executable,
-            "PROJECT", "SAVE",
-            f"SOURCE={project_path}",
-            f"DESTINATION={new_project_path}",
-            f"PREFABSFOLDER={prefabs_folder}",
-            "FORMAT=VERSIONED",
-            "CLEANUP=TRUE"
-        ]
-        
-        log_message(f"Running command: {' '.join(save_command)}")
-        save_process = subprocess.Popen(
-            save_command, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True, 
-            creationflags=subprocess.CREATE_NO_WINDOW
+        runner = as_runner(projecttool_executable)
+        save_command, save_stdout, save_stderr = runner.save_project(
+            project_path, new_project_path, prefabs_folder
         )
-        save_stdout, save_stderr = save_process.communicate()
+        log_message(f"Running command ({runner.name}): {' '.join(save_command)}")
         log_message(f"SAVE stdout: {save_stdout}")
         log_message(f"SAVE stderr: {save_stderr}")
 
@@ -106,25 +95,11 @@ def convert_single_project(project_path, projecttool_executable, prefabs_folder)
             project_folder_path = os.path.join(current_dir, project_folder_name)
             
             # Uruchamiamy konwersję używając pliku tymczasowego
-            save_command = [
-                projecttool_executable,
-                "PROJECT", "SAVE",
-                f"SOURCE={temp_project_path}",
-                f"DESTINATION={project_folder_path}",
-                f"PREFABSFOLDER={prefabs_folder}",
-                "FORMAT=VERSIONED",
-                "CLEANUP=TRUE"
-            ]
-            
-            log_message(f"Running command: {' '.join(save_command)}")
-            save_process = subprocess.Popen(
-                save_command, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True, 
-                creationflags=subprocess.CREATE_NO_WINDOW
+            runner = as_runner(projecttool_executable)
+            save_command, save_stdout, save_stderr = runner.save_project(
+                temp_project_path, project_folder_path, prefabs_folder
             )
-            save_stdout, save_stderr = save_process.communicate()
+            log_message(f"Running command ({runner.name}): {' '.join(save_command)}")
             log_message(f"SAVE stdout: {save_stdout}")
             log_message(f"SAVE stderr: {save_stderr}")
 
@@ -233,6 +208,7 @@ def convert_single_project(project_path, projecttool_executable, prefabs_folder)
                     destination = os.path.join(current_dir, folder)
                     shutil.move(source, destination)
                 shutil.move(old_project_path, project_path)
+                return False
     
     except Exception as e:
         log_message(f"Error during conversion of {project_name}: {str(e)}")
@@ -241,9 +217,21 @@ def convert_single_project(project_path, projecttool_executable, prefabs_folder)
     return True
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        log_message("Usage: python gm_convert_to_newest_ver.py <project_path>")
+    if len(sys.argv) < 2:
+        log_message("Usage: python gm_convert_to_newest_ver_with_old_proj_init.py <project_path|directory|list.txt|@list> [...]")
         sys.exit(1)
     
-    project_path = sys.argv[1]
-    convert_single_project(project_path, projecttool_path, prefabs_folder)
\ No newline at end of file
+    project_paths = collect_project_paths(sys.argv[1:])
+    if len(project_paths) == 1:
+        success = convert_single_project(project_paths[0], projecttool_path, prefabs_folder)
+        sys.exit(0 if success else 1)
+
+    # Wiele projektów - równolegle, ale projekty z tego samego folderu po kolei (wspólne _old, mvc, options)
+    log_message(f"Converting {len(project_paths)} projects with up to {projecttool_path.max_workers} workers")
+    failed = run_batch(
+        project_paths,
+        lambda project_path: convert_single_project(project_path, projecttool_path, prefabs_folder),
+        projecttool_path.max_workers,
+        log_message
+    )
+    sys.exit(1 if failed else 0)
\ No newline at end of file
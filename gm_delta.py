@@ -0,0 +1,116 @@
+import os
+import json
+import shutil
+import hashlib
+
+# Tryb delta: ProjectTool zapisuje do folderu roboczego, a do właściwego folderu docelowego
+# trafiają tylko nowe, zmienione i usunięte pliki (atomowe os.replace w obrębie tego samego dysku)
+
+DELTA_SCRATCH_FOLDER = ".gm_delta_scratch"
+DELTA_CHANGESET_NAME = "delta_changeset.json"
+
+
+def get_scratch_dir(target_dir):
+    """Folder roboczy obok katalogu docelowego (ten sam dysk, więc przeniesienie jest atomowe)"""
+    target_dir = os.path.normpath(target_dir)
+    return os.path.join(os.path.dirname(target_dir), DELTA_SCRATCH_FOLDER, os.path.basename(target_dir))
+
+
+def fast_hash(path, limiter=None):
+    """limiter: opcjonalny gm_priority.BandwidthLimiter dla odczytu"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as data_file:
+        for block in iter(lambda: data_file.read(1024 * 1024), b""):
+            if limiter is not None:
+                limiter.consume(len(block))
+            digest.update(block)
+    return digest.digest()
+
+
+def list_files(folder):
+    """Ścieżki względne wszystkich plików w folderze"""
+    result = set()
+    for root, _, files in os.walk(folder):
+        for name in files:
+            result.add(os.path.relpath(os.path.join(root, name), folder))
+    return result
+
+
+def list_directories(folder):
+    """Ścieżki względne wszystkich podfolderów (także pustych)"""
+    result = set()
+    for root, dirs, _ in os.walk(folder):
+        for name in dirs:
+            result.add(os.path.relpath(os.path.join(root, name), folder))
+    return result
+
+
+def files_differ(first_path, second_path, limiter=None):
+    """Najpierw rozmiar, dopiero przy równym rozmiarze hash"""
+    if os.path.getsize(first_path) != os.path.getsize(second_path):
+        return True
+    return fast_hash(first_path, limiter) != fast_hash(second_path, limiter)
+
+
+def apply_delta(scratch_dir, target_dir, limiter=None):
+    """
+    Przenosi do target_dir tylko różnice względem scratch_dir i usuwa pliki oraz foldery, których już nie ma.
+    Zwraca słownik ze zmianami: added, changed, deleted, added_dirs, deleted_dirs (listy ścieżek względnych)
+    i unchanged (liczba). limiter ogranicza przepustowość odczytu przy porównywaniu.
+    """
+    changeset = {"added": [], "changed": [], "deleted": [], "added_dirs": [], "deleted_dirs": [], "unchanged": 0}
+    new_files = list_files(scratch_dir)
+    old_files = list_files(target_dir) if os.path.isdir(target_dir) else set()
+    new_dirs = list_directories(scratch_dir)
+    old_dirs = list_directories(target_dir) if os.path.isdir(target_dir) else set()
+
+    # Foldery, także puste, muszą istnieć w celu tak jak w świeżym wyniku ProjectTool
+    for relative_path in sorted(new_dirs - old_dirs):
+        os.makedirs(os.path.join(target_dir, relative_path), exist_ok=True)
+        changeset["added_dirs"].append(relative_path)
+
+    for relative_path in sorted(new_files):
+        source_path = os.path.join(scratch_dir, relative_path)
+        destination_path = os.path.join(target_dir, relative_path)
+        if relative_path not in old_files:
+            changeset["added"].append(relative_path)
+        elif files_differ(source_path, destination_path, limiter):
+            changeset["changed"].append(relative_path)
+        else:
+            changeset["unchanged"] += 1
+            continue
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        os.replace(source_path, destination_path)
+
+    for relative_path in sorted(old_files - new_files):
+        os.remove(os.path.join(target_dir, relative_path))
+        changeset["deleted"].append(relative_path)
+
+    # Usuwamy tylko foldery, których nie ma w nowym wyniku - od najgłębszych
+    for relative_path in sorted(old_dirs - new_dirs, key=lambda path: path.count(os.sep), reverse=True):
+        os.rmdir(os.path.join(target_dir, relative_path))
+        changeset["deleted_dirs"].append(relative_path)
+
+    return changeset
+
+
+def remove_scratch_dir(scratch_dir):
+    if os.path.exists(scratch_dir):
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    # Sprzątamy też pusty folder nadrzędny .gm_delta_scratch
+    try:
+        os.rmdir(os.path.dirname(scratch_dir))
+    except OSError:
+        pass
+
+
+def describe_changeset(changeset):
+    return (f"{len(changeset['added'])} added, {len(changeset['changed'])} changed, "
+            f"{len(changeset['deleted'])} deleted, {changeset['unchanged']} unchanged, "
+            f"{len(changeset['added_dirs'])} folders added, {len(changeset['deleted_dirs'])} folders deleted")
+
+
+def save_changesets(path, changesets):
+    """Zapisuje podsumowanie zmian wszystkich projektów z tego uruchomienia"""
+    with open(path, "w", encoding="utf-8") as changeset_file:
+        json.dump(changesets, changeset_file, indent=2, ensure_ascii=False)
@@ -0,0 +1,184 @@
+import os
+import sys
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# Historia uruchomień w lokalnej bazie SQLite - trendy czasów konwersji i wykrywanie regresji
+
+HISTORY_DB_NAME = "conversion_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    projecttool_version TEXT,
+    runner TEXT,
+    host TEXT,
+    workers INTEGER
+);
+CREATE TABLE IF NOT EXISTS projects (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    project TEXT NOT NULL,
+    duration REAL,
+    success INTEGER,
+    input_size INTEGER,
+    output_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS projects_by_name ON projects(project);
+"""
+
+
+def get_projecttool_version(runner):
+    """Wersja ProjectTool: GM_PROJECTTOOL_VERSION albo odcisk pliku wykonywalnego (rozmiar + data modyfikacji)"""
+    if os.getenv("GM_PROJECTTOOL_VERSION"):
+        return os.getenv("GM_PROJECTTOOL_VERSION")
+    executable = getattr(runner, "executable", None)
+    if executable and os.path.exists(executable):
+        stat = os.stat(executable)
+        modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        return f"{stat.st_size}@{modified}"
+    return "unknown"
+
+
+class RunHistory:
+    """Dopisuje każde uruchomienie i wynik każdego projektu do bazy (bezpieczne dla wątków)"""
+
+    def __init__(self, db_path=HISTORY_DB_NAME):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def start_run(self, projecttool_version, runner_name, workers, host=None):
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, projecttool_version, runner, host, workers) VALUES (?, ?, ?, ?, ?)",
+                (datetime.now(timezone.utc).isoformat(), projecttool_version, runner_name,
+                 host or socket.gethostname(), workers)
+            )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "UPDATE runs SET finished_at = ? WHERE id = ?",
+                (datetime.now(timezone.utc).isoformat(), run_id)
+            )
+
+    def record_project(self, run_id, project, duration, success, input_size, output_size):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO projects (run_id, project, duration, success, input_size, output_size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, project, duration, int(bool(success)), input_size, output_size)
+            )
+
+    def estimate_durations(self):
+        """Średni czas udanej konwersji każdego projektu (do szeregowania najdłuższych zadań na początku)"""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT project, AVG(duration) FROM projects WHERE success = 1 GROUP BY project"
+            ).fetchall()
+        return dict(rows)
+
+    def list_runs(self):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT r.id, r.started_at, r.projecttool_version, r.runner, r.host, r.workers, "
+                "COUNT(p.project), SUM(p.success), SUM(p.duration) "
+                "FROM runs r LEFT JOIN projects p ON p.run_id = r.id GROUP BY r.id ORDER BY r.id"
+            ).fetchall()
+
+    def _durations(self, where, params):
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT p.project, AVG(p.duration) FROM projects p JOIN runs r ON r.id = p.run_id "
+                f"WHERE p.success = 1 AND {where} GROUP BY p.project",
+                params
+            ).fetchall()
+        return dict(rows)
+
+    def compare(self, baseline, candidate, by_version=False, threshold=0.3):
+        """
+        Porównuje dwa uruchomienia (albo dwie wersje ProjectTool).
+        Zwraca listę (projekt, czas_bazowy, czas_nowy, zmiana) dla projektów wolniejszych o więcej niż threshold.
+        """
+        where = "r.projecttool_version = ?" if by_version else "r.id = ?"
+        before = self._durations(where, (baseline,))
+        after = self._durations(where, (candidate,))
+        regressions = []
+        for project, old_duration in before.items():
+            new_duration = after.get(project)
+            if new_duration is None or not old_duration:
+                continue
+            change = (new_duration - old_duration) / old_duration
+            if change > threshold:
+                regressions.append((project, old_duration, new_duration, change))
+        regressions.sort(key=lambda row: row[3], reverse=True)
+        return regressions
+
+    def slowest(self, limit=20, run_id=None):
+        """Najwolniejsze projekty (w danym uruchomieniu albo średnio we wszystkich)"""
+        with self._lock:
+            if run_id is not None:
+                return self.connection.execute(
+                    "SELECT project, duration, input_size FROM projects WHERE run_id = ? "
+                    "ORDER BY duration DESC LIMIT ?",
+                    (run_id, limit)
+                ).fetchall()
+            return self.connection.execute(
+                "SELECT project, AVG(duration), MAX(input_size) FROM projects "
+                "GROUP BY project ORDER BY AVG(duration) DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+
+def print_report(argv):
+    usage = (
+        "Usage: python gm_history.py <database> runs\n"
+        "       python gm_history.py <database> compare <run_id> <run_id> [threshold]\n"
+        "       python gm_history.py <database> versions <version> <version> [threshold]\n"
+        "       python gm_history.py <database> slowest [limit] [run_id]"
+    )
+    if len(argv) < 2:
+        print(usage)
+        return 1
+
+    history = RunHistory(argv[0])
+    command = argv[1]
+    try:
+        if command == "runs":
+            for run in history.list_runs():
+                run_id, started_at, version, runner, host, workers, count, succeeded, total = run
+                print(f"#{run_id} {started_at} ProjectTool {version} on {host} ({runner}, {workers} workers): "
+                      f"{succeeded or 0}/{count} ok, {total or 0:.1f}s total")
+        elif command in ("compare", "versions") and len(argv) in (4, 5):
+            threshold = float(argv[4]) if len(argv) == 5 else 0.3
+            baseline, candidate = argv[2], argv[3]
+            if command == "compare":
+                baseline, candidate = int(baseline), int(candidate)
+            regressions = history.compare(baseline, candidate, command == "versions", threshold)
+            print(f"Projects slower by more than {threshold:.0%}: {len(regressions)}")
+            for project, old_duration, new_duration, change in regressions:
+                print(f"  {project}: {old_duration:.1f}s -> {new_duration:.1f}s ({change:+.0%})")
+        elif command == "slowest":
+            limit = int(argv[2]) if len(argv) > 2 else 20
+            run_id = int(argv[3]) if len(argv) > 3 else None
+            for project, duration, input_size in history.slowest(limit, run_id):
+                print(f"  {duration:8.1f}s  {input_size or 0:>12} B  {project}")
+        else:
+            print(usage)
+            return 1
+    finally:
+        history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(print_report(sys.argv[1:]))
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import shutil
+import hashlib
+import threading
+import concurrent.futures
+
+from gm_priority import (
+    DEFAULT_SCHEDULING_CLASSES, apply_scheduling_class, check_io_bandwidth, copy_file_limited, get_process_limiter
+)
+
+# Bezstratna optymalizacja PNG po konwersji: ponowna kompresja IDAT z maksymalnym wysiłkiem zlib
+# i usuwanie zbędnych chunków. Dane obrazu po dekompresji są identyczne bajt w bajt.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IMAGE_OPTIMIZE_CACHE_NAME = "image_optimize_cache.json"
+
+# Chunki bez wpływu na wygląd obrazu (metadane edytorów, daty, teksty)
+STRIPPED_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+ZLIB_STRATEGIES = [
+    (zlib.Z_DEFAULT_STRATEGY, 9),
+    (zlib.Z_FILTERED, 9),
+    (zlib.Z_DEFAULT_STRATEGY, 8),
+]
+
+
+def file_hash(path, limiter=None):
+    sha = hashlib.sha1()
+    with open(path, "rb") as image_file:
+        for block in iter(lambda: image_file.read(1024 * 1024), b""):
+            if limiter is not None:
+                limiter.consume(len(block))
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_png_chunks(data):
+    """Dzieli plik PNG na listę (typ, dane); None jeśli to nie jest poprawny PNG"""
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        if len(chunk_data) != length:
+            return None
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+        if chunk_type == b"IEND":
+            return chunks
+    return None
+
+
+def write_png_chunk(chunk_type, chunk_data):
+    crc = zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF
+    return struct.pack(">I4s", len(chunk_data), chunk_type) + chunk_data + struct.pack(">I", crc)
+
+
+def recompress(raw):
+    """Najmniejszy wynik spośród kilku ustawień zlib"""
+    best = None
+    for strategy, mem_level in ZLIB_STRATEGIES:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, mem_level, strategy)
+        candidate = compressor.compress(raw) + compressor.flush()
+        if best is None or len(candidate) < len(best):
+            best = candidate
+    return best
+
+
+def optimize_png(path):
+    """
+    Optymalizuje jeden plik w miejscu. Zwraca (ścieżka, rozmiar_przed, rozmiar_po, czas_cpu, hash_po, błąd).
+    Plik jest podmieniany tylko gdy jest mniejszy, a zdekompresowane dane obrazu są identyczne.
+    Odczyt i zapis podlegają limitowi przepustowości procesu puli (io_bandwidth klasy image_optimize).
+    """
+    start_cpu = time.process_time()
+    limiter = get_process_limiter()
+    try:
+        with open(path, "rb") as image_file:
+            data = image_file.read()
+        old_size = len(data)
+        if limiter is not None:
+            limiter.consume(old_size)
+        chunks = read_png_chunks(data)
+        if chunks is None:
+            return path, old_size, old_size, time.process_time() - start_cpu, None, "not a valid PNG"
+
+        raw = zlib.decompress(b"".join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b"IDAT"))
+        new_idat = recompress(raw)
+        if zlib.decompress(new_idat) != raw:
+            return path, old_size, old_size, time.process_time() - start_cpu, None, "pixel data mismatch"
+
+        output = [PNG_SIGNATURE]
+        idat_written = False
+        for chunk_type, chunk_data in chunks:
+            if chunk_type in STRIPPED_CHUNKS:
+                continue
+            if chunk_type == b"IDAT":
+                if not idat_written:
+                    output.append(write_png_chunk(b"IDAT", new_idat))
+                    idat_written = True
+                continue
+            output.append(write_png_chunk(chunk_type, chunk_data))
+        new_data = b"".join(output)
+
+        if len(new_data) >= old_size:
+            return path, old_size, old_size, time.process_time() - start_cpu, hashlib.sha1(data).hexdigest(), None
+
+        temp_path = path + ".opt.tmp"
+        if limiter is not None:
+            limiter.consume(len(new_data))
+        with open(temp_path, "wb") as image_file:
+            image_file.write(new_data)
+        os.replace(temp_path, path)
+        return path, old_size, len(new_data), time.process_time() - start_cpu, hashlib.sha1(new_data).hexdigest(), None
+    except Exception as e:
+        return path, 0, 0, time.process_time() - start_cpu, None, str(e)
+
+
+class ImageOptimizer:
+    """
+    Zbiera foldery skonwertowanych projektów i optymalizuje ich pliki PNG w puli procesów
+    z klasą szeregowania scheduling (domyślnie niski priorytet CPU i I/O).
+    cpu_budget ogranicza łączny czas CPU (w sekundach) na jedno uruchomienie - po jego przekroczeniu
+    nowe pliki nie są już zlecane.
+    Pamięć podręczna: "optimized" - ścieżka -> hash po optymalizacji, "sources" - hash pliku z ProjectTool ->
+    hash po optymalizacji (tryb delta rozpoznaje po nim pliki, które już są zoptymalizowane w folderze docelowym).
+    """
+
+    def __init__(self, cache_path, max_workers=1, cpu_budget=None, log=print, scheduling=None):
+        self.cache_path = cache_path
+        self.scheduling = scheduling or DEFAULT_SCHEDULING_CLASSES["image_optimize"]
+        check_io_bandwidth("image_optimize", self.scheduling)
+        self.max_workers = max_workers
+        self.cpu_budget = cpu_budget
+        self.log = log
+        self.pending = []
+        self.cache = {"optimized": {}, "sources": {}}
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                loaded = json.load(cache_file)
+            if "optimized" in loaded and "sources" in loaded:
+                self.cache = loaded
+            else:
+                # Stary format: same ścieżki -> hash
+                self.cache["optimized"] = loaded
+        self.summary = self._empty_summary()
+        self.executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty_summary():
+        return {"files": 0, "skipped": 0, "errors": 0, "bytes_before": 0, "bytes_after": 0, "cpu_seconds": 0.0}
+
+    def _get_executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=apply_scheduling_class,
+                    initargs=(self.scheduling,)
+                )
+            return self.executor
+
+    def _budget_exceeded(self):
+        return self.cpu_budget is not None and self.summary["cpu_seconds"] >= self.cpu_budget
+
+    def _record(self, result, source_hash=None):
+        path, old_size, new_size, cpu_seconds, new_hash, error = result
+        with self._lock:
+            self.summary["cpu_seconds"] += cpu_seconds
+            if error:
+                self.summary["errors"] += 1
+            else:
+                self.summary["files"] += 1
+                self.summary["bytes_before"] += old_size
+                self.summary["bytes_after"] += new_size
+                self.cache["optimized"][os.path.abspath(path)] = new_hash
+                if source_hash:
+                    self.cache["sources"][source_hash] = new_hash
+        if error:
+            self.log(f"Image optimization skipped for {path}: {error}")
+
+    def add_tree(self, folder):
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if name.lower().endswith(".png"):
+                    self.pending.append(os.path.join(root, name))
+
+    def _already_optimized(self, path):
+        cached_hash = self.cache["optimized"].get(os.path.abspath(path))
+        return cached_hash is not None and cached_hash == file_hash(path, self.scheduling.limiter)
+
+    def optimize_scratch_tree(self, scratch_dir, target_dir):
+        """
+        Tryb delta: optymalizuje PNG w folderze roboczym przed porównaniem z folderem docelowym,
+        żeby niezmienione obrazy porównały się jako identyczne. Jeśli plik docelowy jest już
+        zoptymalizowaną wersją tego samego pliku z ProjectTool, kopiujemy go zamiast liczyć od nowa.
+        Wywoływane z wątków konwersji - czeka na wynik.
+        """
+        futures = {}
+        for root, _, files in os.walk(scratch_dir):
+            for name in files:
+                if not name.lower().endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                limiter = self.scheduling.limiter
+                source_hash = file_hash(path, limiter)
+                target_path = os.path.join(target_dir, os.path.relpath(path, scratch_dir))
+                optimized_hash = self.cache["sources"].get(source_hash)
+                if (optimized_hash and os.path.isfile(target_path)
+                        and file_hash(target_path, limiter) == optimized_hash):
+                    if limiter is not None:
+                        copy_file_limited(target_path, path, limiter)
+                    else:
+                        shutil.copy2(target_path, path)
+                    with self._lock:
+                        self.summary["skipped"] += 1
+                    continue
+                if self._budget_exceeded():
+                    continue
+                futures[self._get_executor().submit(optimize_png, path)] = source_hash
+        for future in concurrent.futures.as_completed(futures):
+            self._record(future.result(), futures[future])
+
+    def run(self, shutdown=True):
+        """
+        Optymalizuje zebrane pliki i zwraca podsumowanie od poprzedniego wywołania.
+        shutdown=False zostawia pulę procesów na kolejne wywołania (tryb ciągły).
+        """
+        queue = []
+        for path in self.pending:
+            if self._already_optimized(path):
+                self.summary["skipped"] += 1
+            else:
+                queue.append(path)
+        self.pending = []
+
+        budget_exceeded = False
+        executor = self._get_executor() if queue else None
+        # Ograniczona liczba zleceń w toku, żeby budżet CPU był sprawdzany na bieżąco
+        in_flight = set()
+        queue.reverse()
+        while queue or in_flight:
+            while queue and len(in_flight) < self.max_workers * 2 and not budget_exceeded:
+                in_flight.add(executor.submit(optimize_png, queue.pop()))
+            if not in_flight:
+                break
+            done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                self._record(future.result())
+            if self._budget_exceeded() and not budget_exceeded:
+                budget_exceeded = True
+                self.log(f"Image optimization CPU budget reached, {len(queue)} files left for the next run")
+
+        if shutdown and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as cache_file:
+            json.dump(self.cache, cache_file, indent=2, ensure_ascii=False)
+
+        summary = self.summary
+        summary["bytes_saved"] = summary["bytes_before"] - summary["bytes_after"]
+        self.summary = self._empty_summary()
+        return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python gm_image_optimize.py <folder> [<folder> ...]")
+        sys.exit(1)
+    optimizer = ImageOptimizer(os.path.join(sys.argv[1], IMAGE_OPTIMIZE_CACHE_NAME), max_workers=os.cpu_count() or 1)
+    for folder in sys.argv[1:]:
+        optimizer.add_tree(folder)
+    result = optimizer.run()
+    print(f"Optimized {result['files']} images, skipped {result['skipped']}, saved {result['bytes_saved']} bytes")
@@ -1,16 +1,25 @@
 import os
-import subprocess
 import logging
 import concurrent.futures
 import shutil
+import sys
+import time
 from datetime import datetime, timezone
 
-# Configure logging to a file with thread safety
-logging.basicConfig(
-    filename='conversion_log.txt',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='w'
+from gm_delta import (
+    DELTA_CHANGESET_NAME, apply_delta, describe_changeset, get_scratch_dir, remove_scratch_dir, save_changesets
+)
+from gm_history import RunHistory, get_projecttool_version
+from gm_image_optimize import IMAGE_OPTIMIZE_CACHE_NAME, ImageOptimizer
+from gm_packaging import ProjectPackager
+from gm_priority import (
+    DEFAULT_SCHEDULING_CLASSES, SchedulingClass, check_io_bandwidth, copy_with_scheduling, remove_with_scheduling,
+    thread_scheduling, validate_scheduling_classes
+)
+from gm_runner import as_runner, default_prefabs_folder, get_runner
+from gm_watch import ProjectWatcher
+from gm_striping import (
+    OutputRootDispatcher, get_index_path, get_project_size, get_tree_size, load_output_index, save_output_index
 )
 
 # Lista standardowych folderów GameMaker
@@ -26,8 +35,34 @@ GM_PROJECT_FOLDERS = {
 #output_directory = r"C:\Users\micha\Downloads\itch\_yyp24"
 projects_directory = r"D:\Projects\maartenjensen.com_uniqc (uniqc indiedb)\gms2 z gm8"
 output_directory = r"D:\Projects\maartenjensen.com_uniqc (uniqc indiedb)\_gm24"
-projecttool_path = r"C:\Program Files\GameMaker\ProjectTool\ProjectTool.exe"
-prefabs_folder = os.path.join(os.getenv("APPDATA"), "GameMakerStudio2", "Prefabs")
+# Kilka katalogów docelowych (np. po jednym na fizyczny dysk) - projekty trafiają na najmniej obciążony.
+# Opcjonalne katalogi tymczasowe (staging) w tej samej kolejności, None = obok pliku źródłowego.
+# Dotyczy tylko pojedynczych plików (.yyz, .gmez, ...): tymczasowa kopia .yyp projektu w folderze
+# musi leżeć obok jego zasobów, więc zawsze trafia do folderu źródłowego.
+output_directories = [output_directory]
+staging_directories = None
+# Baza SQLite z historią uruchomień (raporty: python gm_history.py <baza> runs|compare|versions|slowest), None = wyłączona
+history_database = "conversion_history.sqlite"
+# Bezstratna optymalizacja PNG po konwersji (pula procesów o niskim priorytecie, budżet CPU w sekundach, None = bez limitu)
+optimize_images = False
+image_optimize_workers = 1
+image_optimize_cpu_budget = None
+# Tryb delta: ProjectTool zapisuje do folderu roboczego, a w folderze docelowym zmieniane są tylko różniące się pliki
+delta_output = False
+# Pakowanie każdego skonwertowanego projektu do archiwum: None, "zip" (.yyz) albo "tar.zst"
+package_format = None
+package_workers = 2
+package_delete_tree = False
+# Klasy szeregowania (nice CPU, klasa I/O - ionice na Linuksie, przypięcie do rdzeni, limit bajtów/s przy kopiowaniu)
+# dla ProjectTool i etapów w tle, np. "projecttool": SchedulingClass(nice=10, io_class="best-effort", io_level=7)
+scheduling_classes = dict(DEFAULT_SCHEDULING_CLASSES)
+# Tryb ciągły (także: python gm_mass_convert_to_newest_ver_x4.py --watch) - konwertuje tylko nowe/zmienione projekty
+watch_projects = False
+watch_settle_seconds = 5
+watch_poll_interval = 10
+# Folder na kopie tymczasowe w trybie ciągłym, gdy staging_directories = None (poza obserwowanym katalogiem)
+WATCH_STAGING_FOLDER = ".gm_watch_staging"
+# Backend ProjectTool: GM_RUNNER=windows|wine|container|fake (patrz gm_runner.py), tworzony w bloku __main__
 
 def log_message(message):
     logging.info(message)
@@ -39,7 +74,8 @@ def get_shortened_project_name(project_name):
         return project_name.split(" - ", 1)[1]
     return project_name
 
-def process_project(project_path, new_project_dest_path, projecttool_executable, prefabs_folder):
+def process_project(project_path, new_project_dest_path, projecttool_executable, prefabs_folder, keep_source=False):
+    """keep_source=True (tryb ciągły) - folder źródłowy nie jest zmieniany, np. nie usuwamy z niego mvc"""
     try:
         log_message(f"Processing project: {project_path}")
 
@@ -67,25 +103,11 @@ def process_project(project_path, new_project_dest_path, projecttool_executable,
             temp_project_path = project_path
 
         # Convert the project
-        save_command = [
-            projecttool_executable,
-            "PROJECT", "SAVE",
-            f"SOURCE={temp_project_path}",
-            f"DESTINATION={new_project_dest_path}",
-            f"PREFABSFOLDER={prefabs_folder}",
-            "FORMAT=VERSIONED",
-            "CLEANUP=TRUE"
-        ]
-        
-        log_message(f"Running command: {' '.join(save_command)}")
-        save_process = subprocess.Popen(
-            save_command, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True, 
-            creationflags=subprocess.CREATE_NO_WINDOW
+        runner = as_runner(projecttool_executable)
+        save_command, save_stdout, save_stderr = runner.save_project(
+            temp_project_path, new_project_dest_path, prefabs_folder
         )
-        save_stdout, save_stderr = save_process.communicate()
+        log_message(f"Running command ({runner.name}): {' '.join(save_command)}")
         log_message(f"SAVE stdout: {save_stdout}")
         log_message(f"SAVE stderr: {save_stderr}")
 
@@ -103,7 +125,7 @@ def process_project(project_path, new_project_dest_path, projecttool_executable,
         options_path = os.path.join(destination_dir, "options")
         if os.path.exists(options_path):
             try:
-                shutil.rmtree(options_path)
+                remove_with_scheduling(options_path, scheduling_classes["cleanup"])
                 log_message(f"Removed options folder from: {options_path}")
             except Exception as e:
                 log_message(f"Error removing options folder: {str(e)}")
@@ -112,16 +134,16 @@ def process_project(project_path, new_project_dest_path, projecttool_executable,
         options_dir_path = os.path.join(destination_dir, "options_dir")
         if os.path.exists(options_dir_path):
             try:
-                shutil.rmtree(options_dir_path)
+                remove_with_scheduling(options_dir_path, scheduling_classes["cleanup"])
                 log_message(f"Removed options_dir folder from: {options_dir_path}")
             except Exception as e:
                 log_message(f"Error removing options_dir folder: {str(e)}")
 
             # Usuń stary folder mvc jeśli istnieje (przed konwersją)
             old_mvc_path = os.path.join(source_dir, "mvc")
-            if os.path.exists(old_mvc_path):
+            if os.path.exists(old_mvc_path) and not keep_source:
                 try:
-                    shutil.rmtree(old_mvc_path)
+                    remove_with_scheduling(old_mvc_path, scheduling_classes["cleanup"])
                     log_message(f"Removed old mvc folder from source directory: {old_mvc_path}")
                 except Exception as e:
                     log_message(f"Error removing old mvc folder: {str(e)}")
@@ -139,7 +161,7 @@ def process_project(project_path, new_project_dest_path, projecttool_executable,
                 
                 try: # shutil.move czy copy2?
                     destination_item_path = os.path.join(destination_dir, item)
-                    shutil.copy2(source_item_path, destination_item_path)
+                    copy_with_scheduling(source_item_path, destination_item_path, scheduling_classes["extras_copy"])
                     log_message(f"Moved additional item: {item}")
                 except Exception as e:
                     log_message(f"Error moving additional item {item}: {str(e)}")
@@ -153,14 +175,18 @@ def process_project(project_path, new_project_dest_path, projecttool_executable,
             os.remove(temp_project_path)
         return False
 
-def process_single_file(project_path, new_project_dest_path, projecttool_executable, prefabs_folder):
+def process_single_file(project_path, new_project_dest_path, projecttool_executable, prefabs_folder, staging_dir=None,
+                        keep_source=False):
     """
     Przetwarza pojedyncze pliki (.yyz, .gmez, .gmz, .yymp, .yymps)
+    Plik tymczasowy ze skróconą nazwą trafia do staging_dir (jeśli podany)
+    keep_source=True (tryb ciągły) - folder źródłowy nie jest zmieniany, np. nie usuwamy z niego mvc
     """
     try:
         log_message(f"Processing single file: {project_path}")
         
         # Upewnij się, że katalog docelowy istnieje
+        source_dir = os.path.dirname(project_path)
         destination_dir = os.path.dirname(new_project_dest_path)
         os.makedirs(destination_dir, exist_ok=True)
 
@@ -172,7 +198,9 @@ def process_single_file(project_path, new_project_dest_path, projecttool_executa
         
         # Utwórz plik tymczasowy ze skróconą nazwą jeśli potrzebne
         if shortened_name != base_name:
-            temp_project_path = os.path.join(os.path.dirname(project_path), shortened_name + extension)
+            temp_dir = staging_dir or os.path.dirname(project_path)
+            os.makedirs(temp_dir, exist_ok=True)
+            temp_project_path = os.path.join(temp_dir, shortened_name + extension)
             if os.path.exists(temp_project_path):
                 os.remove(temp_project_path)
             shutil.copy2(project_path, temp_project_path)
@@ -181,25 +209,11 @@ def process_single_file(project_path, new_project_dest_path, projecttool_executa
             temp_project_path = project_path
 
         # Konwertuj projekt
-        save_command = [
-            projecttool_executable,
-            "PROJECT", "SAVE",
-            f"SOURCE={temp_project_path}",
-            f"DESTINATION={new_project_dest_path}",
-            f"PREFABSFOLDER={prefabs_folder}",
-            "FORMAT=VERSIONED",
-            "CLEANUP=TRUE"
-        ]
-        
-        log_message(f"Running command: {' '.join(save_command)}")
-        save_process = subprocess.Popen(
-            save_command, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True, 
-            creationflags=subprocess.CREATE_NO_WINDOW
+        runner = as_runner(projecttool_executable)
+        save_command, save_stdout, save_stderr = runner.save_project(
+            temp_project_path, new_project_dest_path, prefabs_folder
         )
-        save_stdout, save_stderr = save_process.communicate()
+        log_message(f"Running command ({runner.name}): {' '.join(save_command)}")
         log_message(f"SAVE stdout: {save_stdout}")
         log_message(f"SAVE stderr: {save_stderr}")
 
@@ -216,7 +230,7 @@ def process_single_file(project_path, new_project_dest_path, projecttool_executa
         options_path = os.path.join(destination_dir, "options")
         if os.path.exists(options_path):
             try:
-                shutil.rmtree(options_path)
+                remove_with_scheduling(options_path, scheduling_classes["cleanup"])
                 log_message(f"Removed options folder from: {options_path}")
             except Exception as e:
                 log_message(f"Error removing options folder: {str(e)}")
@@ -225,16 +239,16 @@ def process_single_file(project_path, new_project_dest_path, projecttool_executa
         options_dir_path = os.path.join(destination_dir, "options_dir")
         if os.path.exists(options_dir_path):
             try:
-                shutil.rmtree(options_dir_path)
+                remove_with_scheduling(options_dir_path, scheduling_classes["cleanup"])
                 log_message(f"Removed options_dir folder from: {options_dir_path}")
             except Exception as e:
                 log_message(f"Error removing options_dir folder: {str(e)}")
 
         # Usuń stary folder mvc jeśli istnieje (przed konwersją)
         old_mvc_path = os.path.join(source_dir, "mvc")
-        if os.path.exists(old_mvc_path):
+        if os.path.exists(old_mvc_path) and not keep_source:
             try:
-                shutil.rmtree(old_mvc_path)
+                remove_with_scheduling(old_mvc_path, scheduling_classes["cleanup"])
                 log_message(f"Removed old mvc folder from source directory: {old_mvc_path}")
             except Exception as e:
                 log_message(f"Error removing old mvc folder: {str(e)}")
@@ -251,32 +265,102 @@ def process_single_file(project_path, new_project_dest_path, projecttool_executa
 def convert_project_wrapper(args):
     return process_project(*args)
 
-def convert_projects(projects_dir, output_dir, projecttool_executable, prefabs_folder):
+def process_striped_task(dispatcher, task_info, runner, delta=False, finish_executor=None, image_optimizer=None):
+    """
+    Wybiera katalog docelowy dopiero gdy wątek faktycznie zaczyna zadanie (najmniej bajtów w toku,
+    najkrótsza kolejka), uruchamia konwersję, mierzy czas samego ProjectTool i zwalnia rezerwację po zakończeniu.
+    W trybie delta ProjectTool zapisuje do folderu roboczego, a porównanie (i optymalizacja obrazów) trafia
+    do finish_executor - zwracany jest wtedy Future drugiego etapu, a slot konwersji od razu się zwalnia.
+    """
+    slot, output_root, staging_root = dispatcher.acquire(task_info["name"], task_info["input_size"])
+    new_project_dest_path = os.path.join(output_root, task_info["relative_destination"])
+    task_info["destination"] = new_project_dest_path
+    target_dir = os.path.dirname(new_project_dest_path)
+    convert_dest_path = new_project_dest_path
+    if delta:
+        scratch_dir = get_scratch_dir(target_dir)
+        if os.path.exists(scratch_dir):
+            shutil.rmtree(scratch_dir)
+        convert_dest_path = os.path.join(scratch_dir, os.path.basename(new_project_dest_path))
+    project_path = task_info["project_path"]
+    keep_source = task_info.get("keep_source", False)
+    if os.path.splitext(project_path)[1] in ['.gmez', '.gmz', '.yymp', '.yyz', '.yymps']:
+        task = (process_single_file, project_path, convert_dest_path, runner, task_info["prefabs_folder"], staging_root,
+                keep_source)
+    else:
+        task = (process_project, project_path, convert_dest_path, runner, task_info["prefabs_folder"], keep_source)
+
+    runner.take_elapsed()
+    try:
+        try:
+            result = task[0](*task[1:])
+        finally:
+            # Historia porównuje wersje ProjectTool, więc zapisujemy tylko czas samego ProjectTool
+            task_info["duration"] = runner.take_elapsed()
+        if delta and result:
+            future = finish_executor.submit(
+                finish_delta, dispatcher, slot, task_info, image_optimizer, scratch_dir, target_dir
+            )
+            slot = None
+            return future
+        if result:
+            dispatcher.record_location(task_info["name"], slot)
+        return result
+    finally:
+        if slot is not None:
+            if delta:
+                remove_scratch_dir(scratch_dir)
+            dispatcher.release(slot, task_info["input_size"])
+
+def finish_delta(dispatcher, slot, task_info, image_optimizer, scratch_dir, target_dir):
+    """
+    Drugi etap trybu delta (poza slotami konwersji): obrazy są optymalizowane jeszcze w folderze roboczym,
+    żeby niezmienione PNG porównały się jako identyczne, a do folderu docelowego trafiają tylko zmienione pliki
+    """
+    try:
+        if image_optimizer:
+            image_optimizer.optimize_scratch_tree(scratch_dir, target_dir)
+        with thread_scheduling(scheduling_classes["verification"]):
+            changeset = apply_delta(scratch_dir, target_dir, scheduling_classes["verification"].limiter)
+        task_info["changeset"] = changeset
+        log_message(f"Delta for {task_info['name']}: {describe_changeset(changeset)}")
+        dispatcher.record_location(task_info["name"], slot)
+        return True
+    finally:
+        remove_scratch_dir(scratch_dir)
+        dispatcher.release(slot, task_info["input_size"])
+
+def collect_project_tasks(projects_dir, projecttool_executable, prefabs_folder, only_projects=None):
+    """
+    Zbiera zadania (plik_projektu, względna_ścieżka_docelowa, ProjectTool, prefabs) z katalogu z projektami.
+    only_projects ogranicza je do podanych plików/folderów projektów (tryb ciągły).
+    """
     project_tasks = []
     
     # Najpierw zbieramy pojedyncze pliki z głównego katalogu
     for file in os.listdir(projects_dir):
         if file.endswith((".gmez", ".gmz", ".yymp", ".yyz", ".yymps")):
             project_path = os.path.join(projects_dir, file)
+            if only_projects is not None and project_path not in only_projects:
+                continue
             if os.path.isfile(project_path):
                 # Dla plików .gmez i .gmz dodajemy " gmx" do nazwy folderu
                 is_gms1 = file.endswith((".gmez", ".gmz"))
                 base_name = os.path.splitext(file)[0]
                 new_folder_name = base_name + " gmx" if is_gms1 else base_name
                 
-                # Tworzymy folder docelowy z pełną nazwą (nie skróconą)
-                new_folder_path = os.path.join(output_dir, new_folder_name)
-                os.makedirs(new_folder_path, exist_ok=True)
-                
+                # Folder docelowy ma pełną nazwę (nie skróconą), katalog główny wybieramy przy zlecaniu
                 # Ale plik projektowy będzie miał skróconą nazwę
                 shortened_base_name = get_shortened_project_name(base_name)
-                new_project_dest_path = os.path.join(new_folder_path, shortened_base_name + '.yyp')
+                new_project_dest_path = os.path.join(new_folder_name, shortened_base_name + '.yyp')
                 # Używamy process_single_file dla pojedynczych plików
                 project_tasks.append((project_path, new_project_dest_path, projecttool_executable, prefabs_folder))
 
 # Następnie zbieramy projekty z podfolderów (używamy oryginalnej funkcji process_project)
     for folder_name in os.listdir(projects_dir):
         folder_path = os.path.join(projects_dir, folder_name)
+        if only_projects is not None and folder_path not in only_projects:
+            continue
         
         if os.path.isdir(folder_path):
             for file in os.listdir(folder_path):
@@ -292,8 +376,6 @@ def convert_projects(projects_dir, output_dir, projecttool_executable, prefabs_f
                     else:
                         new_folder_name = folder_name
                         
-                    new_folder_path = os.path.join(output_dir, new_folder_name)
-                    os.makedirs(new_folder_path, exist_ok=True)
 
                     if file.endswith(".project.gmx"):
                         base_name = file.replace('.project.gmx', '')
@@ -302,29 +384,272 @@ def convert_projects(projects_dir, output_dir, projecttool_executable, prefabs_f
                         base_name = os.path.splitext(file)[0]
                         shortened_base_name = get_shortened_project_name(base_name)
 
-                    new_project_dest_path = os.path.join(new_folder_path, shortened_base_name + '.yyp')
+                    new_project_dest_path = os.path.join(new_folder_name, shortened_base_name + '.yyp')
                     # Używamy oryginalnej funkcji process_project dla projektów w folderach
                     project_tasks.append((project_path, new_project_dest_path, projecttool_executable, prefabs_folder))
 
-    # Przetwarzamy wszystkie zadania równolegle
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for task in project_tasks:
-            if os.path.splitext(task[0])[1] in ['.gmez', '.gmz', '.yymp', '.yyz', '.yymps']:
-                futures.append(executor.submit(process_single_file, *task))
+    return project_tasks
+
+
+class ConversionSession:
+    """
+    Jedna pula wątków konwersji, jeden wpis w historii i jeden indeks wyjściowy na całe uruchomienie.
+    Projekty można zlecać pojedynczo w dowolnym momencie (tryb ciągły), a wyniki są obsługiwane w collect().
+    Gdy nic nie jest w toku, flush() optymalizuje obrazy, pakuje projekty i zapisuje indeks oraz zmiany delta.
+    keep_source=True (tryb ciągły): konwersja nie zmienia obserwowanych folderów źródłowych.
+    """
+
+    def __init__(self, output_dir, projecttool_executable, staging_dirs=None, history_db=None,
+                 image_optimizer=None, delta=False, packager=None, keep_source=False):
+        # io_bandwidth tylko tam, gdzie etap faktycznie ogranicza przepustowość
+        validate_scheduling_classes(scheduling_classes)
+        # Bez luźnego folderu tryb delta nie ma z czym porównywać i za każdym razem zapisuje wszystko od nowa
+        if delta and packager is not None and packager.delete_tree:
+            raise ValueError("package_delete_tree cannot be combined with delta_output")
+        # Liczba wątków wynika z limitu backendu (każdy backend ma własny)
+        self.runner = as_runner(projecttool_executable)
+        if self.runner.scheduling is None:
+            self.runner.scheduling = scheduling_classes["projecttool"]
+        check_io_bandwidth("projecttool", self.runner.scheduling)
+        log_message(f"Using ProjectTool runner: {self.runner.describe()}")
+        # Każde zadanie trafia na katalog docelowy z najmniejszą liczbą bajtów w toku i najkrótszą kolejką
+        self.index_path = get_index_path(output_dir)
+        self.dispatcher = OutputRootDispatcher(output_dir, staging_dirs, load_output_index(self.index_path))
+        self.image_optimizer = image_optimizer
+        self.delta = delta
+        self.packager = packager
+        self.keep_source = keep_source
+
+        # Historia uruchomień - czasy z poprzednich przebiegów pozwalają zacząć od najdłuższych projektów
+        self.history = RunHistory(history_db) if history_db else None
+        self.run_id = None
+        self.estimates = {}
+        if self.history:
+            self.run_id = self.history.start_run(
+                get_projecttool_version(self.runner), self.runner.name, self.runner.max_workers
+            )
+            self.estimates = self.history.estimate_durations()
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.runner.max_workers)
+        # Drugi etap trybu delta (optymalizacja obrazów, porównanie) nie zajmuje slotów konwersji
+        self.finish_executor = (
+            concurrent.futures.ThreadPoolExecutor(max_workers=self.runner.max_workers) if delta else None
+        )
+        self.futures = {}
+        # Projekty zakończone od ostatniego flush() i zmiany delta z całego uruchomienia
+        self.completed = []
+        self.changesets = {}
+        # Folder zleconego archiwum -> nazwa logiczna projektu w indeksie
+        self.packaged_names = {}
+
+    def _submit_package(self, logical_name, destination_dir):
+        self.packaged_names[destination_dir] = logical_name
+        self.packager.submit(destination_dir)
+
+    def submit_tasks(self, project_tasks):
+        """
+        Zleca zadania (najdłuższe wg historii najpierw) i zwraca listę obiektów Future,
+        które kończą się dopiero po obsłużeniu wyniku w collect() (także po drugim etapie trybu delta)
+        """
+        project_tasks = sorted(
+            project_tasks, key=lambda task: self.estimates.get(os.path.dirname(task[1]), 0), reverse=True
+        )
+        submitted = []
+        for project_path, relative_dest_path, _, task_prefabs_folder in project_tasks:
+            task_info = {
+                "name": os.path.dirname(relative_dest_path),
+                "project_path": project_path,
+                "relative_destination": relative_dest_path,
+                "prefabs_folder": task_prefabs_folder,
+                "input_size": get_project_size(project_path),
+                "keep_source": self.keep_source,
+                "completion": concurrent.futures.Future(),
+            }
+            future = self.executor.submit(
+                process_striped_task, self.dispatcher, task_info, self.runner, self.delta, self.finish_executor,
+                self.image_optimizer
+            )
+            self.futures[future] = task_info
+            submitted.append(task_info["completion"])
+        return submitted
+
+    def collect(self, wait=False):
+        """Obsługuje zakończone konwersje (wait=True - czeka na wszystkie). Zwraca liczbę zadań w toku."""
+        while self.futures:
+            if wait:
+                done = list(concurrent.futures.as_completed(list(self.futures)))
             else:
-                futures.append(executor.submit(process_project, *task))
-            
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                result = future.result()
-                if result:
-                    log_message("Project processed successfully.")
-                else:
-                    log_message("Project processing failed.")
-            except Exception as e:
-                log_message(f"Project processing failed with exception: {e}")
+                done = [future for future in self.futures if future.done()]
+            if not done:
+                break
+            for future in done:
+                self._handle_result(future)
+        return len(self.futures)
+
+    def _handle_result(self, future):
+        task_info = self.futures.pop(future)
+        result = False
+        try:
+            result = future.result()
+            if isinstance(result, concurrent.futures.Future):
+                # Tryb delta: ProjectTool skończył, czekamy na drugi etap
+                self.futures[result] = task_info
+                return
+            task_info["success"] = result
+            if result:
+                log_message("Project processed successfully.")
+            else:
+                log_message("Project processing failed.")
+        except Exception as e:
+            log_message(f"Project processing failed with exception: {e}")
+        # Katalog docelowy jest znany dopiero po starcie zadania
+        destination_dir = os.path.dirname(task_info["destination"]) if "destination" in task_info else None
+        # Rozmiar wyniku liczymy przed pakowaniem (package_delete_tree usuwa folder)
+        if self.history:
+            self.history.record_project(
+                self.run_id, task_info["name"], task_info.get("duration"), result, task_info["input_size"],
+                get_tree_size(destination_dir) if destination_dir else 0
+            )
+        # W trybie delta obrazy są już zoptymalizowane w folderze roboczym
+        if result and self.image_optimizer and not self.delta:
+            self.image_optimizer.add_tree(destination_dir)
+        elif result and self.packager:
+            self._submit_package(task_info["name"], destination_dir)
+        if "changeset" in task_info:
+            self.changesets[task_info["name"]] = task_info["changeset"]
+        self.completed.append(task_info)
+        task_info["completion"].set_result(result)
+
+    def flush(self, shutdown=False):
+        """Etapy po konwersjach dla projektów zakończonych od ostatniego wywołania"""
+        completed, self.completed = self.completed, []
+
+        # Optymalizacja obrazów dopiero po konwersjach, żeby nie zabierać im CPU
+        if self.image_optimizer:
+            summary = self.image_optimizer.run(shutdown)
+            log_message(
+                f"Image optimization: {summary['files']} files, {summary['skipped']} already optimized, "
+                f"{summary['errors']} errors, saved {summary['bytes_saved']} bytes in {summary['cpu_seconds']:.1f}s CPU"
+            )
+            # Z optymalizacją obrazów pakujemy dopiero zoptymalizowane drzewa
+            if self.packager and not self.delta:
+                for info in completed:
+                    if info.get("success"):
+                        self._submit_package(info["name"], os.path.dirname(info["destination"]))
+
+        if self.packager:
+            summary = self.packager.finish(shutdown)
+            log_message(
+                f"Packaging: {summary['packed']} packed, {summary['unchanged']} unchanged, "
+                f"{summary['failed']} failed, {summary['bytes']} bytes"
+            )
+            # Bez luźnego folderu indeks wskazuje archiwum
+            for folder, archive_path in summary["archives"].items():
+                logical_name = self.packaged_names.pop(folder, None)
+                if self.packager.delete_tree and logical_name is not None:
+                    self.dispatcher.set_location(logical_name, archive_path)
+            self.packaged_names.clear()
+
+        # Indeks: nazwa logiczna projektu -> faktyczna lokalizacja
+        save_output_index(self.index_path, self.dispatcher.index)
+        log_message(f"Output index saved to: {self.index_path}")
+
+        # Podsumowanie zmian każdego projektu w trybie delta
+        if self.delta:
+            changeset_path = os.path.join(os.path.dirname(self.index_path), DELTA_CHANGESET_NAME)
+            save_changesets(changeset_path, self.changesets)
+            log_message(f"Delta changesets saved to: {changeset_path}")
+
+    def tick(self):
+        """Tryb ciągły: obsługuje zakończone konwersje, a gdy nic nie jest w toku - etapy końcowe"""
+        if self.collect() == 0 and self.completed:
+            self.flush()
+
+    def close(self):
+        self.collect(wait=True)
+        self.executor.shutdown()
+        if self.finish_executor is not None:
+            self.finish_executor.shutdown()
+        self.flush(shutdown=True)
+        # Czas zakończenia obejmuje też optymalizację obrazów i pakowanie
+        if self.history:
+            self.history.finish_run(self.run_id)
+            self.history.close()
+
+
+def convert_projects(projects_dir, output_dir, projecttool_executable, prefabs_folder, staging_dirs=None, history_db=None,
+                     image_optimizer=None, delta=False, only_projects=None, packager=None):
+    """
+    output_dir może być listą katalogów - wtedy projekty są rozkładane między nie.
+    only_projects ogranicza konwersję do podanych plików/folderów projektów (tryb ciągły).
+    """
+    project_tasks = collect_project_tasks(projects_dir, projecttool_executable, prefabs_folder, only_projects)
+    session = ConversionSession(output_dir, projecttool_executable, staging_dirs, history_db, image_optimizer, delta,
+                                packager)
+    try:
+        # Przetwarzamy wszystkie zadania równolegle
+        session.submit_tasks(project_tasks)
+    finally:
+        session.close()
 
 if __name__ == "__main__":
-    # Call the conversion function
-    convert_projects(projects_directory, output_directory, projecttool_path, prefabs_folder)
\ No newline at end of file
+    # Logowanie i backend konfigurujemy tylko w procesie głównym: procesy pul (spawn - domyślnie na Windows)
+    # importują ten skrypt ponownie i nie mogą nadpisywać conversion_log.txt
+    # Configure logging to a file with thread safety
+    logging.basicConfig(
+        filename='conversion_log.txt',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filemode='w'
+    )
+    projecttool_path = get_runner()
+    prefabs_folder = default_prefabs_folder()
+
+    image_optimizer = None
+    if optimize_images:
+        image_optimizer = ImageOptimizer(
+            os.path.join(output_directories[0], IMAGE_OPTIMIZE_CACHE_NAME),
+            image_optimize_workers, image_optimize_cpu_budget, log_message, scheduling_classes["image_optimize"]
+        )
+
+    packager = None
+    if package_format:
+        packager = ProjectPackager(
+            package_format, package_workers, package_delete_tree, log_message, scheduling_classes["packaging"]
+        )
+
+    if watch_projects or "--watch" in sys.argv:
+        # Kopie tymczasowe ze skróconą nazwą nie mogą trafiać do obserwowanego katalogu - zostałyby wzięte
+        # za nowe projekty, więc bez staging_directories lądują w ukrytym folderze w katalogach docelowych
+        watch_staging_directories = staging_directories or [
+            os.path.join(output_root, WATCH_STAGING_FOLDER) for output_root in output_directories
+        ]
+        # Jedna sesja (pula wątków, wpis w historii, indeks) na cały czas obserwowania
+        session = ConversionSession(output_directories, projecttool_path, watch_staging_directories, history_database,
+                                    image_optimizer, delta_output, packager, keep_source=True)
+
+        def convert_changed_project(project_key):
+            return session.submit_tasks(
+                collect_project_tasks(projects_directory, projecttool_path, prefabs_folder, {project_key})
+            )
+
+        watcher = ProjectWatcher(
+            projects_directory, convert_changed_project, watch_settle_seconds, watch_poll_interval, log=log_message,
+            tick_callback=session.tick
+        )
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            log_message("Watch mode stopped")
+        finally:
+            session.close()
+            if not staging_directories:
+                for staging_dir in watch_staging_directories:
+                    try:
+                        os.rmdir(staging_dir)
+                    except OSError:
+                        pass
+    else:
+        # Call the conversion function
+        convert_projects(projects_directory, output_directories, projecttool_path, prefabs_folder, staging_directories,
+                         history_database, image_optimizer, delta_output, packager=packager)
\ No newline at end of file
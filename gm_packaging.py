@@ -0,0 +1,185 @@
+import os
+import sys
+import shutil
+import tarfile
+import zipfile
+import hashlib
+import concurrent.futures
+
+from gm_delta import fast_hash
+from gm_priority import (
+    DEFAULT_SCHEDULING_CLASSES, LimitedReader, apply_scheduling_class, check_io_bandwidth, get_process_limiter
+)
+
+# Pakowanie skonwertowanych projektów do archiwów (.yyz = zip albo .tar.zst) w puli procesów.
+# Pliki są czytane prosto z drzewa projektu do archiwum, bez dodatkowej kopii.
+# tar.zst wymaga Pythona 3.14+ (compression.zstd) albo pakietu zstandard.
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_EXTENSIONS = {"zip": ".yyz", "tar.zst": ".tar.zst"}
+MANIFEST_EXTENSION = ".manifest"
+
+
+def get_manifest_hash(folder, limiter=None):
+    """Hash listy plików (ścieżka, rozmiar, hash zawartości) - zmienia się tylko gdy zmieni się drzewo projektu"""
+    sha = hashlib.sha1()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            relative_path = os.path.relpath(path, folder).replace(os.sep, "/")
+            sha.update(f"{relative_path}\0{stat.st_size}\0".encode("utf-8") + fast_hash(path, limiter))
+    return sha.hexdigest()
+
+
+def get_archive_path(folder, archive_format):
+    return os.path.normpath(folder) + ARCHIVE_EXTENSIONS[archive_format]
+
+
+def iter_archive_files(folder):
+    """Pliki projektu w stałej kolejności jako (ścieżka, nazwa w archiwum) - ścieżki względem folderu projektu"""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield path, os.path.relpath(path, folder).replace(os.sep, "/")
+
+
+def write_zip(folder, archive_path, limiter=None):
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for path, arcname in iter_archive_files(folder):
+            if limiter is None:
+                archive.write(path, arcname)
+                continue
+            # Z limitem przepustowości plik jest czytany przez LimitedReader zamiast przez zipfile
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as source_file, archive.open(info, "w") as archive_file:
+                shutil.copyfileobj(LimitedReader(source_file, limiter), archive_file, 1024 * 1024)
+
+
+def write_tar(folder, compressed, limiter=None):
+    # Ten sam układ co w zip: pliki projektu w głównym katalogu archiwum
+    with tarfile.open(fileobj=compressed, mode="w|") as archive:
+        for path, arcname in iter_archive_files(folder):
+            with open(path, "rb") as source_file:
+                archive.addfile(
+                    archive.gettarinfo(path, arcname),
+                    LimitedReader(source_file, limiter) if limiter is not None else source_file
+                )
+
+
+def write_tar_zst(folder, archive_path, limiter=None):
+    if zstd is not None:
+        with zstd.ZstdFile(archive_path, "w") as compressed:
+            write_tar(folder, compressed, limiter)
+    elif zstandard is not None:
+        with open(archive_path, "wb") as raw_file:
+            with zstandard.ZstdCompressor(level=10).stream_writer(raw_file) as compressed:
+                write_tar(folder, compressed, limiter)
+    else:
+        raise RuntimeError("tar.zst packaging requires Python 3.14+ or the zstandard package")
+
+
+def package_project(folder, archive_format="zip", delete_tree=False):
+    """
+    Pakuje jeden folder projektu. Zwraca (folder, ścieżka_archiwum, status, rozmiar_archiwum, błąd),
+    status: packed / unchanged / failed
+    Odczyt podlega limitowi przepustowości procesu puli (io_bandwidth klasy packaging).
+    """
+    archive_path = get_archive_path(folder, archive_format)
+    manifest_path = archive_path + MANIFEST_EXTENSION
+    limiter = get_process_limiter()
+    try:
+        manifest_hash = get_manifest_hash(folder, limiter)
+        if os.path.exists(archive_path) and os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+                if manifest_file.read().strip() == manifest_hash:
+                    if delete_tree:
+                        shutil.rmtree(folder)
+                    return folder, archive_path, "unchanged", os.path.getsize(archive_path), None
+
+        temp_path = archive_path + ".tmp"
+        if archive_format == "zip":
+            write_zip(folder, temp_path, limiter)
+        else:
+            write_tar_zst(folder, temp_path, limiter)
+        os.replace(temp_path, archive_path)
+        with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(manifest_hash + "\n")
+
+        if delete_tree:
+            shutil.rmtree(folder)
+        return folder, archive_path, "packed", os.path.getsize(archive_path), None
+    except Exception as e:
+        if os.path.exists(archive_path + ".tmp"):
+            os.remove(archive_path + ".tmp")
+        return folder, archive_path, "failed", 0, str(e)
+
+
+class ProjectPackager:
+    """Pakuje projekty równolegle w puli procesów (klasa szeregowania scheduling), zaraz po ich konwersji"""
+
+    def __init__(self, archive_format="zip", max_workers=2, delete_tree=False, log=print, scheduling=None):
+        if archive_format not in ARCHIVE_EXTENSIONS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.archive_format = archive_format
+        self.scheduling = scheduling or DEFAULT_SCHEDULING_CLASSES["packaging"]
+        check_io_bandwidth("packaging", self.scheduling)
+        self.max_workers = max_workers
+        self.delete_tree = delete_tree
+        self.log = log
+        self.executor = None
+        self.futures = []
+
+    def submit(self, folder):
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=apply_scheduling_class,
+                initargs=(self.scheduling,)
+            )
+        self.futures.append(self.executor.submit(package_project, folder, self.archive_format, self.delete_tree))
+
+    def finish(self, shutdown=True):
+        """
+        Czeka na wszystkie zlecone archiwa i zwraca podsumowanie.
+        summary["archives"]: folder -> ścieżka archiwum dla projektów spakowanych bez błędu.
+        shutdown=False zostawia pulę procesów na kolejne zlecenia (tryb ciągły).
+        """
+        summary = {"packed": 0, "unchanged": 0, "failed": 0, "bytes": 0, "archives": {}}
+        for future in concurrent.futures.as_completed(self.futures):
+            folder, archive_path, status, size, error = future.result()
+            summary[status] += 1
+            summary["bytes"] += size
+            if status != "failed":
+                summary["archives"][folder] = archive_path
+            if error:
+                self.log(f"Packaging failed for {folder}: {error}")
+            elif status == "packed":
+                self.log(f"Packed {folder} -> {archive_path} ({size} bytes)")
+        if shutdown and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.futures = []
+        return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python gm_packaging.py <project_folder> [<project_folder> ...]")
+        sys.exit(1)
+    packager = ProjectPackager(max_workers=os.cpu_count() or 1)
+    for project_folder in sys.argv[1:]:
+        packager.submit(project_folder)
+    result = packager.finish()
+    print(f"Packed {result['packed']}, unchanged {result['unchanged']}, failed {result['failed']}")
@@ -0,0 +1,284 @@
+import os
+import sys
+import time
+import ctypes
+import shutil
+import platform
+import threading
+from contextlib import contextmanager
+
+# Klasy szeregowania dla procesów potomnych i etapów w tle:
+# nice (CPU), priorytet I/O (ionice na Linuksie), przypięcie do rdzeni i limit przepustowości I/O.
+
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+
+# Numery wywołań systemowych ioprio_set/ioprio_get na Linuksie
+IOPRIO_SYSCALLS = {
+    "x86_64": (251, 252),
+    "amd64": (251, 252),
+    "i386": (289, 290),
+    "i686": (289, 290),
+    "aarch64": (30, 31),
+    "arm64": (30, 31),
+}
+
+# Klasy priorytetu procesów na Windows
+BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+IDLE_PRIORITY_CLASS = 0x00000040
+
+
+class SchedulingClass:
+    """
+    nice: 0 = bez zmian, 1..19 = niższy priorytet CPU
+    io_class: None, "idle", "best-effort" albo "realtime" (z io_level 0..7)
+    cpu_affinity: zbiór numerów rdzeni albo None
+    io_bandwidth: limit bajtów/s albo None - tylko dla etapów z IO_BANDWIDTH_STAGES
+    (w wątkach konwersji wspólny, w pulach procesów osobny dla każdego procesu)
+    """
+
+    def __init__(self, nice=0, io_class=None, io_level=4, cpu_affinity=None, io_bandwidth=None):
+        if io_class is not None and io_class not in IOPRIO_CLASSES:
+            raise ValueError(f"Unknown I/O priority class: {io_class}")
+        self.nice = nice
+        self.io_class = io_class
+        self.io_level = io_level
+        self.cpu_affinity = set(cpu_affinity) if cpu_affinity else None
+        self.io_bandwidth = io_bandwidth
+        self.limiter = BandwidthLimiter(io_bandwidth) if io_bandwidth else None
+
+    def __getstate__(self):
+        # Limiter (z blokadą) nie przechodzi do procesów puli
+        state = self.__dict__.copy()
+        state["limiter"] = None
+        return state
+
+    def __repr__(self):
+        return (f"SchedulingClass(nice={self.nice}, io_class={self.io_class!r}, io_level={self.io_level}, "
+                f"cpu_affinity={self.cpu_affinity}, io_bandwidth={self.io_bandwidth})")
+
+
+DEFAULT_SCHEDULING_CLASSES = {
+    "projecttool": SchedulingClass(),
+    "cleanup": SchedulingClass(io_class="idle"),
+    "extras_copy": SchedulingClass(io_class="idle"),
+    "verification": SchedulingClass(io_class="idle"),
+    "image_optimize": SchedulingClass(nice=19, io_class="idle"),
+    "packaging": SchedulingClass(nice=19, io_class="idle"),
+}
+
+
+# Etapy, które faktycznie ograniczają przepustowość (ProjectTool to osobny program, a usuwanie prawie nie czyta danych)
+IO_BANDWIDTH_STAGES = {"extras_copy", "verification", "image_optimize", "packaging"}
+
+# Limit przepustowości bieżącego procesu puli (ustawiany przez apply_scheduling_class)
+_process_limiter = None
+
+
+def check_io_bandwidth(stage, scheduling):
+    """ValueError gdy io_bandwidth jest ustawione dla etapu, który go nie obsługuje"""
+    if scheduling is not None and scheduling.io_bandwidth and stage not in IO_BANDWIDTH_STAGES:
+        raise ValueError(
+            f"io_bandwidth is only supported for {', '.join(sorted(IO_BANDWIDTH_STAGES))}, not for {stage}"
+        )
+
+
+def validate_scheduling_classes(scheduling_classes):
+    for stage, scheduling in scheduling_classes.items():
+        check_io_bandwidth(stage, scheduling)
+
+
+def container_flags(scheduling):
+    """
+    Klasa szeregowania jako opcje docker/podman run - w kontenerze nice/ionice/taskset
+    przed poleceniem dotyczyłyby tylko klienta, a nie ProjectTool
+    """
+    flags = []
+    if scheduling is None:
+        return flags
+    if scheduling.cpu_affinity:
+        flags.append("--cpuset-cpus=" + ",".join(str(cpu) for cpu in sorted(scheduling.cpu_affinity)))
+    if scheduling.nice:
+        # Waga CPU jak w planiście Linuksa: każdy poziom nice to ok. 1.25x mniej czasu (domyślnie 1024)
+        flags.append(f"--cpu-shares={max(2, int(1024 / 1.25 ** scheduling.nice))}")
+    if scheduling.io_class == "idle":
+        flags.append("--blkio-weight=10")
+    elif scheduling.io_class == "best-effort":
+        flags.append(f"--blkio-weight={1000 - scheduling.io_level * 125}")
+    elif scheduling.io_class == "realtime":
+        flags.append("--blkio-weight=1000")
+    return flags
+
+
+def _ioprio_syscalls():
+    if not sys.platform.startswith("linux"):
+        return None
+    return IOPRIO_SYSCALLS.get(platform.machine().lower())
+
+
+def set_io_priority(io_class, io_level=4, who=0):
+    """ioprio_set dla procesu/wątku (who=0 - bieżący). Zwraca False gdy system tego nie obsługuje."""
+    syscalls = _ioprio_syscalls()
+    if syscalls is None or io_class is None:
+        return False
+    ioprio = (IOPRIO_CLASSES[io_class] << IOPRIO_CLASS_SHIFT) | (io_level if io_class != "idle" else 0)
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall(syscalls[0], IOPRIO_WHO_PROCESS, who, ioprio) == 0
+
+
+def get_io_priority(who=0):
+    syscalls = _ioprio_syscalls()
+    if syscalls is None:
+        return None
+    libc = ctypes.CDLL(None, use_errno=True)
+    result = libc.syscall(syscalls[1], IOPRIO_WHO_PROCESS, who)
+    return result if result >= 0 else None
+
+
+def apply_scheduling_class(scheduling):
+    """Stosuje klasę do bieżącego procesu (initializer puli procesów etapów w tle)"""
+    global _process_limiter
+    if scheduling is None:
+        return
+    # Nowy limiter w każdym procesie - blokada z procesu głównego nie działa między procesami
+    _process_limiter = BandwidthLimiter(scheduling.io_bandwidth) if scheduling.io_bandwidth else None
+    try:
+        if scheduling.nice:
+            if hasattr(os, "nice"):
+                os.nice(scheduling.nice)
+            elif sys.platform == "win32":
+                priority_class = IDLE_PRIORITY_CLASS if scheduling.nice >= 15 else BELOW_NORMAL_PRIORITY_CLASS
+                ctypes.windll.kernel32.SetPriorityClass(ctypes.windll.kernel32.GetCurrentProcess(), priority_class)
+        set_io_priority(scheduling.io_class, scheduling.io_level)
+        if scheduling.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, scheduling.cpu_affinity)
+    except Exception:
+        pass
+
+
+def popen_kwargs(scheduling, base_kwargs=None):
+    """Dokłada do argumentów subprocess.Popen klasę priorytetu procesu (Windows)"""
+    kwargs = dict(base_kwargs or {})
+    if scheduling is not None and os.name == "nt" and scheduling.nice:
+        priority_class = IDLE_PRIORITY_CLASS if scheduling.nice >= 15 else BELOW_NORMAL_PRIORITY_CLASS
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | priority_class
+    return kwargs
+
+
+def command_prefix(scheduling):
+    """
+    Na POSIX klasę ustawiają nice / ionice / taskset przed poleceniem
+    (preexec_fn nie jest bezpieczne przy uruchamianiu procesów z wielu wątków)
+    """
+    prefix = []
+    if scheduling is None or os.name == "nt":
+        return prefix
+    if scheduling.cpu_affinity and shutil.which("taskset"):
+        prefix += ["taskset", "-c", ",".join(str(cpu) for cpu in sorted(scheduling.cpu_affinity))]
+    if scheduling.io_class and shutil.which("ionice"):
+        prefix += ["ionice", "-c", str(IOPRIO_CLASSES[scheduling.io_class])]
+        if scheduling.io_class != "idle":
+            prefix += ["-n", str(scheduling.io_level)]
+    if scheduling.nice and shutil.which("nice"):
+        prefix += ["nice", "-n", str(scheduling.nice)]
+    return prefix
+
+
+def get_process_limiter():
+    return _process_limiter
+
+
+def apply_affinity_after_start(process, scheduling):
+    """Na Windows przypięcie do rdzeni można ustawić dopiero po starcie procesu (opcjonalny pakiet psutil)"""
+    if scheduling is None or not scheduling.cpu_affinity or os.name != "nt":
+        return
+    try:
+        import psutil
+        psutil.Process(process.pid).cpu_affinity(sorted(scheduling.cpu_affinity))
+    except Exception:
+        pass
+
+
+@contextmanager
+def thread_scheduling(scheduling):
+    """
+    Priorytet I/O dla bieżącego wątku na czas etapu (Linux: ioprio działa per wątek), potem przywraca poprzedni.
+    Nice nie jest zmieniany, bo bez uprawnień nie da się go potem przywrócić.
+    """
+    previous = None
+    changed = False
+    if scheduling is not None and scheduling.io_class is not None:
+        thread_id = threading.get_native_id()
+        previous = get_io_priority(thread_id)
+        changed = set_io_priority(scheduling.io_class, scheduling.io_level, thread_id)
+    try:
+        yield
+    finally:
+        if changed and previous is not None:
+            syscalls = _ioprio_syscalls()
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.syscall(syscalls[0], IOPRIO_WHO_PROCESS, threading.get_native_id(), previous)
+
+
+class BandwidthLimiter:
+    """Wspólny dla wątków limit bajtów na sekundę (kubełek z żetonami)"""
+
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = bytes_per_second
+        self.available = bytes_per_second
+        self.last_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.available = min(
+                    self.bytes_per_second, self.available + (now - self.last_time) * self.bytes_per_second
+                )
+                self.last_time = now
+                if self.available >= min(size, self.bytes_per_second):
+                    self.available -= size
+                    return
+                wait_time = (min(size, self.bytes_per_second) - self.available) / self.bytes_per_second
+            time.sleep(wait_time)
+
+
+class LimitedReader:
+    """Plik do odczytu z ograniczeniem przepustowości (np. źródło dla tarfile/zipfile)"""
+
+    def __init__(self, source_file, limiter):
+        self.source_file = source_file
+        self.limiter = limiter
+
+    def read(self, size=-1):
+        data = self.source_file.read(size)
+        self.limiter.consume(len(data))
+        return data
+
+
+def copy_file_limited(source_path, destination_path, limiter, chunk_size=1024 * 1024):
+    """Jak shutil.copy2, ale z ograniczeniem przepustowości"""
+    if os.path.isdir(destination_path):
+        destination_path = os.path.join(destination_path, os.path.basename(source_path))
+    with open(source_path, "rb") as source_file, open(destination_path, "wb") as destination_file:
+        for block in iter(lambda: source_file.read(chunk_size), b""):
+            limiter.consume(len(block))
+            destination_file.write(block)
+    shutil.copystat(source_path, destination_path)
+    return destination_path
+
+
+def copy_with_scheduling(source_path, destination_path, scheduling):
+    """Kopiowanie w etapie w tle: priorytet I/O wątku i opcjonalny limit przepustowości"""
+    with thread_scheduling(scheduling):
+        if scheduling is not None and scheduling.limiter is not None and os.path.isfile(source_path):
+            return copy_file_limited(source_path, destination_path, scheduling.limiter)
+        return shutil.copy2(source_path, destination_path)
+
+
+def remove_with_scheduling(path, scheduling):
+    """Usuwanie folderu w etapie w tle z priorytetem I/O wątku"""
+    with thread_scheduling(scheduling):
+        shutil.rmtree(path)
@@ -0,0 +1,254 @@
+import os
+import time
+import shlex
+import subprocess
+import threading
+
+from gm_priority import apply_affinity_after_start, command_prefix, container_flags, popen_kwargs
+
+# Backendy uruchamiające ProjectTool.exe
+# Wybór backendu: zmienna GM_RUNNER = windows | wine | container | fake
+# (domyślnie windows na Windows, wine na pozostałych systemach)
+
+DEFAULT_WINDOWS_PROJECTTOOL = r"C:\Program Files\GameMaker\ProjectTool\ProjectTool.exe"
+DEFAULT_WINE_PROJECTTOOL = os.path.expanduser(
+    "~/.wine/drive_c/Program Files/GameMaker/ProjectTool/ProjectTool.exe"
+)
+
+
+def default_prefabs_folder():
+    """Zwraca folder Prefabs GameMakera (bez wywracania się na Linuksie, gdzie nie ma APPDATA)"""
+    if os.getenv("GM_PREFABS_FOLDER"):
+        return os.getenv("GM_PREFABS_FOLDER")
+    if os.getenv("APPDATA"):
+        return os.path.join(os.getenv("APPDATA"), "GameMakerStudio2", "Prefabs")
+    return os.path.expanduser("~/.local/share/GameMakerStudio2/Prefabs")
+
+
+def build_save_arguments(source, destination, prefabs_folder):
+    """Argumenty ProjectTool dla PROJECT SAVE (bez samego pliku wykonywalnego)"""
+    return [
+        "PROJECT", "SAVE",
+        f"SOURCE={source}",
+        f"DESTINATION={destination}",
+        f"PREFABSFOLDER={prefabs_folder}",
+        "FORMAT=VERSIONED",
+        "CLEANUP=TRUE"
+    ]
+
+
+class ProjectToolRunner:
+    """Bazowy backend - każdy ma własny limit równoległości i środowisko"""
+
+    name = "base"
+
+    def __init__(self, max_workers=4, env=None):
+        self.max_workers = max_workers
+        self.env = dict(env or {})
+        self._slots = threading.BoundedSemaphore(max_workers)
+        # Czas samego ProjectTool, osobno dla każdego wątku (take_elapsed)
+        self._timing = threading.local()
+        # Klasa szeregowania procesów ProjectTool (gm_priority.SchedulingClass), None = bez zmian
+        self.scheduling = None
+
+    def translate_path(self, path):
+        """Zamienia ścieżkę lokalną na ścieżkę widzianą przez ProjectTool"""
+        return path
+
+    def build_command(self, source, destination, prefabs_folder):
+        raise NotImplementedError
+
+    def popen_kwargs(self):
+        return {}
+
+    def process_scheduling(self):
+        """Klasa szeregowania stosowana do uruchamianego procesu"""
+        return self.scheduling
+
+    def describe(self):
+        return f"{self.name} (max_workers={self.max_workers})"
+
+    def take_elapsed(self):
+        """Czas wywołań ProjectTool w bieżącym wątku od poprzedniego take_elapsed (bez czekania na slot)"""
+        elapsed = getattr(self._timing, "elapsed", 0.0)
+        self._timing.elapsed = 0.0
+        return elapsed
+
+    def save_project(self, source, destination, prefabs_folder):
+        """Uruchamia PROJECT SAVE i zwraca (command, stdout, stderr)"""
+        with self._slots:
+            start_time = time.perf_counter()
+            try:
+                return self.run_save(source, destination, prefabs_folder)
+            finally:
+                self._timing.elapsed = getattr(self._timing, "elapsed", 0.0) + time.perf_counter() - start_time
+
+    def run_save(self, source, destination, prefabs_folder):
+        scheduling = self.process_scheduling()
+        save_command = command_prefix(scheduling) + self.build_command(source, destination, prefabs_folder)
+        env = None
+        if self.env:
+            env = os.environ.copy()
+            env.update(self.env)
+        save_process = subprocess.Popen(
+            save_command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+            **popen_kwargs(scheduling, self.popen_kwargs())
+        )
+        apply_affinity_after_start(save_process, scheduling)
+        save_stdout, save_stderr = save_process.communicate()
+        return save_command, save_stdout or "", save_stderr or ""
+
+
+class WindowsRunner(ProjectToolRunner):
+    """Natywny ProjectTool.exe na Windows"""
+
+    name = "windows"
+
+    def __init__(self, executable=DEFAULT_WINDOWS_PROJECTTOOL, max_workers=4, env=None):
+        super().__init__(max_workers, env)
+        self.executable = executable
+
+    def build_command(self, source, destination, prefabs_folder):
+        return [self.executable] + build_save_arguments(source, destination, prefabs_folder)
+
+    def popen_kwargs(self):
+        # CREATE_NO_WINDOW istnieje tylko na Windows
+        return {"creationflags": getattr(subprocess, "CREATE_NO_WINDOW", 0)}
+
+
+class WineRunner(ProjectToolRunner):
+    """ProjectTool.exe uruchamiany przez Wine (węzły linuksowe)"""
+
+    name = "wine"
+
+    def __init__(self, executable=DEFAULT_WINE_PROJECTTOOL, wine="wine", max_workers=2, env=None):
+        # Wine źle znosi wiele równoległych procesów na jednym prefiksie, stąd mniejszy limit
+        env = dict(env or {})
+        env.setdefault("WINEDEBUG", "-all")
+        super().__init__(max_workers, env)
+        self.executable = executable
+        self.wine = wine
+
+    def translate_path(self, path):
+        # Dysk Z: w Wine mapuje główny katalog systemu plików
+        if os.name == "nt":
+            return path
+        return "Z:" + os.path.abspath(path).replace("/", "\\")
+
+    def build_command(self, source, destination, prefabs_folder):
+        return [self.wine, self.executable] + build_save_arguments(
+            self.translate_path(source),
+            self.translate_path(destination),
+            self.translate_path(prefabs_folder)
+        )
+
+
+class ContainerRunner(ProjectToolRunner):
+    """
+    Polecenie kontenera budowane z szablonu, np.:
+    ["docker", "run", "--rm", "-v", "{source_dir}:{source_dir}", "-v", "{destination_dir}:{destination_dir}",
+     "-v", "{prefabs_folder}:{prefabs_folder}", "gm-projecttool", "{projecttool_args}"]
+    Wszystkie trzy ścieżki (źródło, cel i PREFABSFOLDER) muszą być widoczne w kontenerze.
+    Element "{projecttool_args}" jest zastępowany listą argumentów PROJECT SAVE.
+    Klasa szeregowania trafia do kontenera jako --cpuset-cpus / --cpu-shares / --blkio-weight:
+    w miejscu elementu "{scheduling_flags}", a bez niego zaraz po "run".
+    """
+
+    name = "container"
+
+    def __init__(self, command_template, max_workers=4, env=None):
+        super().__init__(max_workers, env)
+        self.command_template = list(command_template)
+
+    def process_scheduling(self):
+        # nice/ionice/taskset przed "docker run" dotyczyłyby tylko klienta - klasa idzie w opcjach kontenera
+        return None
+
+    def build_command(self, source, destination, prefabs_folder):
+        # Ścieżki w kontenerze muszą zgadzać się z zamontowanymi folderami, więc zawsze bezwzględne
+        source = os.path.abspath(source)
+        destination = os.path.abspath(destination)
+        prefabs_folder = os.path.abspath(prefabs_folder)
+        values = {
+            "source": source,
+            "destination": destination,
+            "prefabs_folder": prefabs_folder,
+            "source_dir": os.path.dirname(source),
+            "destination_dir": os.path.dirname(destination),
+        }
+        flags = container_flags(self.scheduling)
+        template = list(self.command_template)
+        if "{scheduling_flags}" not in template and "run" in template:
+            template.insert(template.index("run") + 1, "{scheduling_flags}")
+        command = []
+        for part in template:
+            if part == "{projecttool_args}":
+                command.extend(build_save_arguments(source, destination, prefabs_folder))
+            elif part == "{scheduling_flags}":
+                command.extend(flags)
+            else:
+                command.append(part.format(**values))
+        return command
+
+
+class FakeRunner(ProjectToolRunner):
+    """Lokalny zamiennik ProjectTool do testów - tworzy pusty projekt .yyp bez uruchamiania procesu"""
+
+    name = "fake"
+
+    def __init__(self, max_workers=4, env=None, succeed=True):
+        super().__init__(max_workers, env)
+        self.succeed = succeed
+        self.calls = []
+
+    def build_command(self, source, destination, prefabs_folder):
+        return ["ProjectTool(fake)"] + build_save_arguments(source, destination, prefabs_folder)
+
+    def run_save(self, source, destination, prefabs_folder):
+        save_command = self.build_command(source, destination, prefabs_folder)
+        self.calls.append((source, destination, prefabs_folder))
+        if not self.succeed:
+            return save_command, "ProjectTool Failed", "fake failure"
+        # DESTINATION bez .yyp to folder projektu (konwersja w miejscu)
+        if not destination.endswith(".yyp"):
+            destination = os.path.join(destination, os.path.basename(destination) + ".yyp")
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        with open(destination, "w", encoding="utf-8") as project_file:
+            project_file.write('{"resourceType": "GMProject", "resources": []}\n')
+        return save_command, "ProjectTool Successful", ""
+
+
+def get_runner(backend=None, executable=None, max_workers=None):
+    """Tworzy backend na podstawie nazwy lub zmiennych środowiskowych GM_RUNNER / GM_PROJECTTOOL / GM_MAX_WORKERS"""
+    backend = (backend or os.getenv("GM_RUNNER") or ("windows" if os.name == "nt" else "wine")).lower()
+    executable = executable or os.getenv("GM_PROJECTTOOL")
+    if max_workers is None and os.getenv("GM_MAX_WORKERS"):
+        max_workers = int(os.getenv("GM_MAX_WORKERS"))
+
+    kwargs = {}
+    if max_workers is not None:
+        kwargs["max_workers"] = max_workers
+
+    if backend == "windows":
+        return WindowsRunner(executable or DEFAULT_WINDOWS_PROJECTTOOL, **kwargs)
+    if backend == "wine":
+        return WineRunner(executable or DEFAULT_WINE_PROJECTTOOL, wine=os.getenv("GM_WINE", "wine"), **kwargs)
+    if backend == "container":
+        template = os.getenv("GM_CONTAINER_COMMAND")
+        if not template:
+            raise ValueError("GM_CONTAINER_COMMAND must be set for the container runner")
+        return ContainerRunner(shlex.split(template), **kwargs)
+    if backend == "fake":
+        return FakeRunner(**kwargs)
+    raise ValueError(f"Unknown ProjectTool runner: {backend}")
+
+
+def as_runner(projecttool_executable):
+    """Pozwala dalej przekazywać samą ścieżkę do ProjectTool.exe zamiast obiektu backendu"""
+    if isinstance(projecttool_executable, ProjectToolRunner):
+        return projecttool_executable
+    return get_runner(executable=projecttool_executable)
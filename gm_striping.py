@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import shutil
+import threading
+
+from gm_packaging import MANIFEST_EXTENSION
+
+# Rozkładanie skonwertowanych projektów na kilka katalogów docelowych (np. po jednym na dysk)
+
+OUTPUT_INDEX_NAME = "output_index.json"
+
+
+def get_tree_size(path):
+    """Rozmiar folderu w bajtach (0 jeśli nie istnieje)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def get_project_size(project_path):
+    """Rozmiar wejścia w bajtach - plik (.yyz itp.) albo cały folder projektu (.yyp/.project.gmx)"""
+    if os.path.isfile(project_path) and not project_path.endswith((".yyp", ".project.gmx")):
+        return os.path.getsize(project_path)
+    return get_tree_size(os.path.dirname(project_path))
+
+
+class OutputRootDispatcher:
+    """
+    Wybiera najmniej obciążony katalog docelowy (bajty w toku, potem długość kolejki).
+    Projekt zapisany wcześniej na danym katalogu zostaje na nim, żeby nie zostawiać starych kopii.
+    """
+
+    def __init__(self, output_roots, staging_roots=None, index=None):
+        if isinstance(output_roots, str):
+            output_roots = [output_roots]
+        if not output_roots:
+            raise ValueError("At least one output root is required")
+        self.output_roots = list(output_roots)
+        self.staging_roots = list(staging_roots or [None] * len(self.output_roots))
+        if len(self.staging_roots) != len(self.output_roots):
+            raise ValueError("staging_roots must match output_roots")
+        self.in_flight_bytes = [0] * len(self.output_roots)
+        self.queue_depth = [0] * len(self.output_roots)
+        self.index = dict(index or {})
+        self._lock = threading.Lock()
+
+    def _previous_root(self, logical_name):
+        actual_path = self.index.get(logical_name)
+        if not actual_path:
+            return None
+        for i, root in enumerate(self.output_roots):
+            if os.path.normcase(os.path.dirname(actual_path)) == os.path.normcase(os.path.normpath(root)):
+                return i
+        return None
+
+    def set_location(self, logical_name, actual_path):
+        """Zmienia lokalizację projektu w indeksie (np. archiwum po usunięciu spakowanego folderu)"""
+        with self._lock:
+            self.index[logical_name] = actual_path
+
+    def acquire(self, logical_name, size):
+        """Rezerwuje katalog dla projektu i zwraca (numer, output_root, staging_root)"""
+        with self._lock:
+            i = self._previous_root(logical_name)
+            if i is None:
+                i = min(
+                    range(len(self.output_roots)),
+                    key=lambda n: (self.in_flight_bytes[n], self.queue_depth[n], n)
+                )
+            self.in_flight_bytes[i] += size
+            self.queue_depth[i] += 1
+            return i, self.output_roots[i], self.staging_roots[i]
+
+    def record_location(self, logical_name, slot):
+        """Zapisuje w indeksie lokalizację projektu - tylko po udanej konwersji, żeby nie wskazywać pustych folderów"""
+        self.set_location(logical_name, os.path.join(os.path.normpath(self.output_roots[slot]), logical_name))
+
+    def release(self, slot, size):
+        with self._lock:
+            self.in_flight_bytes[slot] -= size
+            self.queue_depth[slot] -= 1
+
+
+def get_index_path(output_roots):
+    if isinstance(output_roots, str):
+        output_roots = [output_roots]
+    return os.path.join(output_roots[0], OUTPUT_INDEX_NAME)
+
+
+def load_output_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "r", encoding="utf-8") as index_file:
+        return json.load(index_file)
+
+
+def save_output_index(index_path, index):
+    """Zapisuje indeks nazwa logiczna -> faktyczna lokalizacja (atomowo przez plik tymczasowy)"""
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as index_file:
+        json.dump(dict(sorted(index.items())), index_file, indent=2, ensure_ascii=False)
+    os.replace(temp_path, index_path)
+
+
+def lower_process_priority():
+    """Obniża priorytet bieżącego procesu (konsolidacja działa w tle)"""
+    try:
+        if hasattr(os, "nice"):
+            os.nice(19)
+        elif sys.platform == "win32":
+            import ctypes
+            BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+            ctypes.windll.kernel32.SetPriorityClass(ctypes.windll.kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+    except Exception:
+        pass
+
+
+def consolidate_outputs(index_path, target_root, log=print):
+    """
+    Przenosi wszystkie projekty z indeksu do jednego katalogu i aktualizuje indeks.
+    Projekty spakowane z usunięciem folderu są w indeksie jako plik archiwum - przenosimy go razem z manifestem.
+    """
+    lower_process_priority()
+    index = load_output_index(index_path)
+    os.makedirs(target_root, exist_ok=True)
+    for logical_name, actual_path in sorted(index.items()):
+        is_archive = os.path.isfile(actual_path)
+        target_path = os.path.join(target_root, os.path.basename(actual_path) if is_archive else logical_name)
+        if os.path.normcase(os.path.abspath(actual_path)) == os.path.normcase(os.path.abspath(target_path)):
+            continue
+        if not os.path.exists(actual_path):
+            log(f"Skipping missing output: {actual_path}")
+            continue
+        try:
+            if os.path.isdir(target_path):
+                shutil.rmtree(target_path)
+            elif os.path.exists(target_path):
+                os.remove(target_path)
+            shutil.move(actual_path, target_path)
+            if is_archive and os.path.exists(actual_path + MANIFEST_EXTENSION):
+                shutil.move(actual_path + MANIFEST_EXTENSION, target_path + MANIFEST_EXTENSION)
+            index[logical_name] = target_path
+            log(f"Consolidated {logical_name}: {actual_path} -> {target_path}")
+        except Exception as e:
+            log(f"Error consolidating {logical_name}: {str(e)}")
+    save_output_index(index_path, index)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python gm_striping.py <output_index.json> <target_directory>")
+        sys.exit(1)
+    consolidate_outputs(sys.argv[1], sys.argv[2])
@@ -0,0 +1,214 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Tryb ciągły: obserwuje katalog z projektami i konwertuje tylko nowe/zmienione projekty.
+# Powiadomienia systemu plików przez opcjonalny pakiet watchdog (inotify na Linuksie),
+# bez niego - okresowe skanowanie katalogu.
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+SINGLE_FILE_EXTENSIONS = (".gmez", ".gmz", ".yymp", ".yyz", ".yymps")
+FOLDER_PROJECT_EXTENSIONS = (".yyp", ".project.gmx")
+
+
+def get_project_key(projects_dir, path):
+    """
+    Zamienia ścieżkę ze zdarzenia na klucz projektu:
+    plik projektu w katalogu głównym albo folder projektu (pierwszy poziom podfolderów)
+    """
+    relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(projects_dir))
+    if relative_path.startswith(os.pardir) or relative_path == os.curdir:
+        return None
+    parts = relative_path.split(os.sep)
+    if len(parts) == 1:
+        if parts[0].endswith(SINGLE_FILE_EXTENSIONS):
+            return os.path.join(projects_dir, parts[0])
+        if os.path.isdir(os.path.join(projects_dir, parts[0])):
+            return os.path.join(projects_dir, parts[0])
+        return None
+    return os.path.join(projects_dir, parts[0])
+
+
+def get_project_signature(key):
+    """
+    Podpis stanu projektu (rozmiar i czas modyfikacji); None jeśli projektu nie ma
+    albo folder nie zawiera pliku .yyp/.project.gmx
+    """
+    try:
+        if os.path.isfile(key):
+            stat = os.stat(key)
+            return (1, stat.st_size, stat.st_mtime_ns)
+        if not os.path.isdir(key):
+            return None
+        if not any(name.endswith(FOLDER_PROJECT_EXTENSIONS) for name in os.listdir(key)):
+            return None
+        count = total = latest = 0
+        for root, _, files in os.walk(key):
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                count += 1
+                total += stat.st_size
+                latest = max(latest, stat.st_mtime_ns)
+        return (count, total, latest)
+    except OSError:
+        return None
+
+
+def list_project_keys(projects_dir):
+    keys = []
+    for name in os.listdir(projects_dir):
+        path = os.path.join(projects_dir, name)
+        if os.path.isdir(path) or name.endswith(SINGLE_FILE_EXTENSIONS):
+            keys.append(path)
+    return keys
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        self.watcher.notify(event.src_path)
+        if getattr(event, "dest_path", None):
+            self.watcher.notify(event.dest_path)
+
+
+class ProjectWatcher:
+    """
+    Zbiera zdarzenia dla projektów (kilka zdarzeń jednego projektu = jeden wpis),
+    czeka aż projekt przestanie się zmieniać przez settle_seconds i przekazuje
+    każdy gotowy projekt do convert_callback(klucz). Callback tylko zleca konwersję i zwraca listę
+    obiektów Future (None = konwersja już się zakończyła); tick_callback() jest wołany w każdym obiegu pętli.
+    Podpis projektu jest brany przed zleceniem konwersji, a zmiany zrobione w jej trakcie zostają w kolejce.
+    Pamięć jest ograniczona: jeden wpis na projekt, a zapamiętanych podpisów jest co najwyżej max_tracked.
+    """
+
+    def __init__(self, projects_dir, convert_callback, settle_seconds=5, poll_interval=10,
+                 max_tracked=10000, use_notifications=True, log=print, tick_callback=None):
+        self.projects_dir = projects_dir
+        self.convert_callback = convert_callback
+        self.tick_callback = tick_callback
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.max_tracked = max_tracked
+        self.use_notifications = use_notifications and Observer is not None
+        self.log = log
+        self.pending = {}
+        # Klucz -> (lista Future, podpis sprzed konwersji) dla projektów w trakcie konwersji
+        self.in_progress = {}
+        self.converted = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _remember(self, key, signature):
+        self.converted[key] = signature
+        self.converted.move_to_end(key)
+        while len(self.converted) > self.max_tracked:
+            self.converted.popitem(last=False)
+
+    def notify(self, path):
+        key = get_project_key(self.projects_dir, path)
+        if key is None:
+            return
+        with self._lock:
+            if key not in self.pending and len(self.pending) >= self.max_tracked:
+                return
+            self.pending[key] = (time.monotonic(), self.pending.get(key, (0, None))[1])
+
+    def scan(self):
+        """Polling: porównuje podpisy wszystkich projektów z zapamiętanymi"""
+        for key in list_project_keys(self.projects_dir):
+            signature = get_project_signature(key)
+            if signature is not None and self.converted.get(key) != signature:
+                with self._lock:
+                    if key not in self.pending:
+                        self.pending[key] = (time.monotonic(), signature)
+
+    def take_ready_projects(self):
+        """
+        Projekty (klucz, podpis), które nie zmieniły się od settle_seconds i różnią się od ostatnio
+        skonwertowanej wersji. Projekty w trakcie konwersji czekają w kolejce na jej koniec.
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            items = list(self.pending.items())
+        for key, (last_change, last_signature) in items:
+            if now - last_change < self.settle_seconds or key in self.in_progress:
+                continue
+            signature = get_project_signature(key)
+            with self._lock:
+                if self.pending.get(key, (None,))[0] != last_change:
+                    continue
+                if signature is None or signature == self.converted.get(key):
+                    # Projekt zniknął (np. plik tymczasowy) albo nic się nie zmieniło
+                    del self.pending[key]
+                elif signature != last_signature:
+                    # Wciąż się zmienia - czekamy kolejny okres
+                    self.pending[key] = (now, signature)
+                else:
+                    del self.pending[key]
+                    ready.append((key, signature))
+        return ready
+
+    def finish_conversions(self):
+        """Zapamiętuje podpis sprzed konwersji dla projektów, których konwersja się zakończyła"""
+        for key, (futures, signature) in list(self.in_progress.items()):
+            if all(future.done() for future in futures):
+                del self.in_progress[key]
+                with self._lock:
+                    self._remember(key, signature)
+
+    def prime(self, convert_existing=False):
+        """Zapamiętuje obecny stan katalogu, żeby nie konwertować ponownie wszystkiego przy starcie"""
+        for key in list_project_keys(self.projects_dir):
+            signature = get_project_signature(key)
+            if signature is None:
+                continue
+            if convert_existing:
+                self.pending[key] = (0, signature)
+            else:
+                self._remember(key, signature)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, convert_existing=False):
+        self.prime(convert_existing)
+        observer = None
+        if self.use_notifications:
+            observer = Observer()
+            observer.schedule(_EventHandler(self), self.projects_dir, recursive=True)
+            observer.start()
+            self.log(f"Watching {self.projects_dir} with filesystem notifications")
+        else:
+            self.log(f"Watching {self.projects_dir} by polling every {self.poll_interval}s")
+
+        last_scan = 0
+        try:
+            while not self._stop.is_set():
+                if observer is None and time.monotonic() - last_scan >= self.poll_interval:
+                    self.scan()
+                    last_scan = time.monotonic()
+                for key, signature in self.take_ready_projects():
+                    self.log(f"Converting changed project: {key}")
+                    self.in_progress[key] = (self.convert_callback(key) or [], signature)
+                if self.tick_callback is not None:
+                    self.tick_callback()
+                self.finish_conversions()
+                self._stop.wait(1)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()